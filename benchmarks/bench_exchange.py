@@ -0,0 +1,369 @@
+"""bench_exchange.py
+
+Microbenchmarks for the TRNSYS <-> PLC exchange hot path.
+
+This script times the parts of `main.py` that run at every TRNSYS time step against the
+in-process `FakeModbusClient`, so that the results reflect the middleware itself and not
+the network or the PLCs. Each benchmark is run over a range of sizes, the results are
+written to JSON and can be compared against a stored baseline with configurable
+regression thresholds. The comparison uses the fastest of several repeats, which is the
+least sensitive to the load of the machine.
+
+Benchmarks
+----------
+encode
+    `encode_inputs`, packing TRNSYS inputs into a preallocated buffer of register words.
+decode
+    `ModbusServer.read_registers`, reading and unpacking the r_registers.
+gather
+    `gather_inputs`, collecting the TRNSYS inputs mapped to a server into a preallocated buffer.
+scatter
+    `scatter_outputs`, sending register values back to the TRNSYS outputs.
+write
+    `ModbusServer.write_inputs` with logging disabled.
+write_logged
+    `ModbusServer.write_inputs` logging to a file at DEBUG level, as configured by
+    `Initialization`. The difference to `write` is the logging overhead.
+end_of_time_step
+    A full `EndOfTimeStep` over many servers, with `SIM_SLEEP` stubbed out.
+
+The register benchmarks run at 1 to 10,000 registers, `end_of_time_step` runs at 1 to
+500 servers with `REGISTERS_PER_SERVER` read-write and read-only registers each.
+
+Functions
+---------
+run_benchmarks(names, quick)
+    Run the selected benchmarks and return the results.
+compare_results(results, baseline, threshold)
+    Compare results against a baseline and return the regressions.
+main_cli(argv)
+    Command line entry point.
+
+Examples
+--------
+Run the suite and compare it with the stored baseline:
+
+    $ python benchmarks/bench_exchange.py --output results.json --baseline benchmarks/baseline.json
+
+Record a new baseline:
+
+    $ python benchmarks/bench_exchange.py --save-baseline benchmarks/baseline.json
+
+"""
+
+# Standard library imports
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from unittest.mock import patch
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+sys.path.insert(0, ROOT_DIR)
+
+# Local imports
+import main
+from tests.fake_client import FakeModbusClient
+
+# --------------------------------------------------------------------------
+
+REGISTER_SIZES = (1, 10, 100, 1000, 10000)
+SERVER_SIZES = (1, 10, 100, 500)
+QUICK_REGISTER_SIZES = (1, 100)
+QUICK_SERVER_SIZES = (1, 10)
+REGISTERS_PER_SERVER = 10
+
+DEFAULT_THRESHOLD = 0.25
+MIN_TIME = 0.1
+QUICK_MIN_TIME = 0.005
+REPEATS = 11
+QUICK_REPEATS = 3
+
+Case = Callable[[], object]
+
+# --------------------------------------------------------------------------
+
+def _make_server(n_rw: int, n_r: int, first_input: int = 0) -> main.ModbusServer:
+    server = main.ModbusServer(
+        host="127.0.0.1",
+        port=502,
+        rw_registers=list(range(1, n_rw + 1)),
+        input_indexes=list(range(first_input, first_input + n_rw)),
+        r_registers=list(range(n_rw + 1, n_rw + n_r + 1)),
+    )
+    server.client = FakeModbusClient()
+    return server
+
+def _inputs(n: int) -> List[float]:
+    return [20.0 + (index % 100) / 10 for index in range(n)]
+
+def _trn_data(n_inputs: int, n_outputs: int) -> Dict[str, Dict[str, List[float]]]:
+    return {main.SIMULATION_MODEL: {"inputs": _inputs(n_inputs), "outputs": [0.0] * n_outputs}}
+
+def setup_encode(size: int) -> Case:
+    values = _inputs(size)
+    words = array('H', [0]) * size
+    return lambda: main.encode_inputs(values, words)
+
+def setup_decode(size: int) -> Case:
+    server = _make_server(0, size)
+    return server.read_registers
+
+def setup_gather(size: int) -> Case:
+    indexes = list(range(size))
+    TRNinputs = _inputs(size)
+    buffer = array('d', [0.0]) * size
+    return lambda: main.gather_inputs(indexes, TRNinputs, buffer)
+
+def setup_scatter(size: int) -> Case:
+    values = list(range(size))
+    TRNoutputs = [0.0] * size
+    return lambda: main.scatter_outputs(values, TRNoutputs)
+
+def setup_write(size: int) -> Case:
+    server = _make_server(size, 0)
+    values = _inputs(size)
+    return lambda: server.write_inputs(values)
+
+def setup_end_of_time_step(size: int) -> Case:
+    servers = [_make_server(REGISTERS_PER_SERVER, REGISTERS_PER_SERVER, i * REGISTERS_PER_SERVER) for i in range(size)]
+    TRNData = _trn_data(size * REGISTERS_PER_SERVER, REGISTERS_PER_SERVER)
+    main.servers = servers
+    # One worker per server, as `Initialization` starts it, so that the exchanges run concurrently.
+    main.start_executor(size)
+    return lambda: main.EndOfTimeStep(TRNData)
+
+# name: (size dimension, setup function, logged)
+BENCHMARKS: Dict[str, Tuple[str, Callable[[int], Case], bool]] = {
+    "encode": ("registers", setup_encode, False),
+    "decode": ("registers", setup_decode, False),
+    "gather": ("registers", setup_gather, False),
+    "scatter": ("registers", setup_scatter, False),
+    "write": ("registers", setup_write, False),
+    "write_logged": ("registers", setup_write, True),
+    "end_of_time_step": ("servers", setup_end_of_time_step, False),
+}
+
+# --------------------------------------------------------------------------
+
+def time_case(case: Case, min_time: float, repeats: int = REPEATS) -> Dict[str, float]:
+    """
+    Time a benchmark case.
+
+    The number of loops is calibrated so that a single repeat takes at least `min_time`
+    seconds, then the case is timed `repeats` times.
+
+    Parameters
+    ----------
+    case : Callable[[], object]
+        The function to be timed.
+    min_time : float
+        Minimum duration of one repeat in seconds.
+    repeats : int
+        Number of timed repeats.
+
+    Returns
+    -------
+    Dict[str, float]
+        Median and minimum time per call in seconds, and the number of loops per repeat.
+
+    """
+
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            case()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            case()
+        timings.append((time.perf_counter() - start) / loops)
+
+    return {"median": statistics.median(timings), "min": min(timings), "loops": loops}
+
+def _configure_logging(logged: bool, log_path: str) -> None:
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    if logged:
+        handler = logging.FileHandler(log_path, mode="w")
+        handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+        root.addHandler(handler)
+        root.setLevel(logging.DEBUG)
+    else:
+        root.addHandler(logging.NullHandler())
+        root.setLevel(logging.WARNING)
+
+def run_benchmarks(names: Optional[Sequence[str]] = None, quick: bool = False) -> Dict[str, Dict[str, object]]:
+    """
+    Run the selected benchmarks at every size of their dimension.
+
+    Parameters
+    ----------
+    names : Optional[Sequence[str]]
+        Names of the benchmarks to run. All benchmarks are run if None.
+    quick : bool
+        Use fewer sizes and shorter timings, for smoke runs.
+
+    Returns
+    -------
+    Dict[str, Dict[str, object]]
+        Results keyed by `<benchmark>/<dimension>=<size>`.
+
+    """
+
+    min_time = QUICK_MIN_TIME if quick else MIN_TIME
+    repeats = QUICK_REPEATS if quick else REPEATS
+    sizes = {
+        "registers": QUICK_REGISTER_SIZES if quick else REGISTER_SIZES,
+        "servers": QUICK_SERVER_SIZES if quick else SERVER_SIZES,
+    }
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir, patch.object(main.osTime, "sleep", lambda seconds: None):
+        log_path = os.path.join(tmp_dir, "bench.log")
+        try:
+            for name in names or BENCHMARKS:
+                dimension, setup, logged = BENCHMARKS[name]
+                _configure_logging(logged, log_path)
+                for size in sizes[dimension]:
+                    timing = time_case(setup(size), min_time, repeats)
+                    results[f"{name}/{dimension}={size}"] = {"benchmark": name, "dimension": dimension, "size": size, **timing}
+        finally:
+            _configure_logging(False, log_path)
+            if main.executor is not None:
+                main.executor.shutdown(wait=True)
+                main.executor = None
+            main.servers = []
+
+    return results
+
+def compare_results(results: Dict[str, Dict[str, object]], baseline: Dict[str, object],
+                    threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    Compare benchmark results against a stored baseline.
+
+    A case regresses when its minimum time exceeds the baseline minimum by more than the
+    threshold. The minimum over the repeats is compared rather than the median, as it only
+    grows with the cost of the code, while the median also follows the load of the machine.
+    The threshold of a benchmark can be overridden in the `thresholds` mapping
+    of the baseline file. Cases missing from either side are ignored.
+
+    Parameters
+    ----------
+    results : Dict[str, Dict[str, object]]
+        Results as returned by `run_benchmarks`.
+    baseline : Dict[str, object]
+        Baseline document with `results` and optional `thresholds` entries.
+    threshold : float
+        Default allowed relative slowdown, 0.25 meaning 25 %.
+
+    Returns
+    -------
+    List[str]
+        A description of each regression, empty if there are none.
+
+    """
+
+    thresholds = baseline.get("thresholds", {})
+    reference = baseline.get("results", {})
+    regressions = []
+
+    for key, result in results.items():
+        if key not in reference:
+            continue
+        allowed = thresholds.get(result["benchmark"], threshold)
+        before, after = reference[key]["min"], result["min"]
+        if after > before * (1 + allowed):
+            regressions.append(f"{key}: {after * 1e6:.2f} us vs baseline {before * 1e6:.2f} us "
+                               f"(+{(after / before - 1) * 100:.0f} %, allowed +{allowed * 100:.0f} %)")
+
+    return regressions
+
+def _document(results: Dict[str, Dict[str, object]]) -> Dict[str, object]:
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+def main_cli(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Command line entry point.
+
+    Parameters
+    ----------
+    argv : Optional[Sequence[str]]
+        Command line arguments, `sys.argv[1:]` if None.
+
+    Returns
+    -------
+    int
+        0 on success, 1 if a regression against the baseline was found.
+
+    """
+
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the TRNSYS <-> PLC exchange hot path.")
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK", help=f"benchmarks to run, from {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--quick", action="store_true", help="fewer sizes and shorter timings")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results against this JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative slowdown against the baseline (default: %(default)s)")
+    parser.add_argument("--save-baseline", help="store the results as a new baseline in this JSON file")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    results = run_benchmarks(args.benchmarks, quick=args.quick)
+
+    for key, result in results.items():
+        print(f"{key:<36} median {result['median'] * 1e6:12.2f} us   min {result['min'] * 1e6:12.2f} us")
+
+    if args.output:
+        with open(args.output, "w") as results_file:
+            json.dump(_document(results), results_file, indent=2)
+
+    if args.save_baseline:
+        # Keep the thresholds and the cases that were not run, so a baseline can be updated per benchmark.
+        stored = {}
+        if os.path.exists(args.save_baseline):
+            with open(args.save_baseline) as baseline_file:
+                stored = json.load(baseline_file)
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump({**_document({**stored.get("results", {}), **results}), "thresholds": stored.get("thresholds", {})},
+                      baseline_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare_results(results, json.load(baseline_file), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
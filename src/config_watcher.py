@@ -0,0 +1,196 @@
+
+"""config_watcher.py
+
+Hot reload of server_config.py during a running simulation.
+
+A multi-day simulation should not have to be stopped to change a register mapping or to
+replace the IP address of a PLC. The `ConfigWatcher` checks the modification time of
+server_config.py, which is a single `stat` call, and loads the file again when it has
+changed, for example after an edit in server_manager.py. `diff_server_configs` then
+compares the new `SERVER_CONFIGS` with the live one, so that main.py can rebuild only
+the servers which changed at the next step boundary. Unchanged servers keep their
+connections and cached outputs.
+
+Servers are matched by host, port and unit id; several servers with the same host, port
+and unit are matched in their order of appearance. A server whose host, port or unit
+changes is therefore removed and added again.
+
+Classes
+-------
+ConfigDiff
+    The differences between two lists of server configurations.
+ConfigWatcher
+    Detects and loads changes of server_config.py.
+
+Functions
+---------
+load_server_configs(filename)
+    Loads `SERVER_CONFIGS` from a file.
+diff_server_configs(old, new)
+    Compares two lists of server configurations.
+
+"""
+
+# Standard library imports
+import logging
+import os
+import runpy
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# --------------------------------------------------------------------------
+
+ServerConfig = Dict[str, object]
+
+# --------------------------------------------------------------------------
+
+class ConfigDiff(NamedTuple):
+    """
+    The differences between two lists of server configurations.
+
+    Attributes
+    ----------
+    unchanged : List[Tuple[int, int]]
+        Pairs of old and new indexes of the servers whose configuration is identical.
+    changed : List[Tuple[int, int]]
+        Pairs of old and new indexes of the servers with the same host, port and unit whose
+        configuration differs.
+    added : List[int]
+        New indexes of the servers which are not in the old configuration.
+    removed : List[int]
+        Old indexes of the servers which are not in the new configuration.
+
+    """
+
+    unchanged: List[Tuple[int, int]]
+    changed: List[Tuple[int, int]]
+    added: List[int]
+    removed: List[int]
+
+    def __bool__(self) -> bool:
+        return bool(self.changed or self.added or self.removed)
+
+def _keys(server_configs: List[ServerConfig]) -> List[Tuple[str, int, Optional[int], int]]:
+    seen = {}
+    keys = []
+    for config in server_configs:
+        key = (config["host"], config["port"], config.get("unit"))
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        keys.append(key + (occurrence,))
+    return keys
+
+def diff_server_configs(old: List[ServerConfig], new: List[ServerConfig]) -> ConfigDiff:
+    """
+    Compare two lists of server configurations.
+
+    Parameters
+    ----------
+    old : List[ServerConfig]
+        The live server configurations.
+    new : List[ServerConfig]
+        The server configurations loaded from the changed file.
+
+    Returns
+    -------
+    ConfigDiff
+        The unchanged, changed, added and removed servers.
+
+    """
+
+    old_indexes = {key: index for index, key in enumerate(_keys(old))}
+    diff = ConfigDiff([], [], [], [])
+
+    for new_index, key in enumerate(_keys(new)):
+        old_index = old_indexes.pop(key, None)
+        if old_index is None:
+            diff.added.append(new_index)
+        elif old[old_index] == new[new_index]:
+            diff.unchanged.append((old_index, new_index))
+        else:
+            diff.changed.append((old_index, new_index))
+
+    diff.removed.extend(sorted(old_indexes.values()))
+    return diff
+
+def load_server_configs(filename: str) -> List[ServerConfig]:
+    """
+    Load `SERVER_CONFIGS` from a file.
+
+    The file is executed on its own, without touching the imported server_config module.
+
+    Parameters
+    ----------
+    filename : str
+        Path of server_config.py.
+
+    Returns
+    -------
+    List[ServerConfig]
+        The server configurations.
+
+    Raises
+    ------
+    ValueError
+        If the file does not define a `SERVER_CONFIGS` list of dictionaries with a host and a port.
+    Exception
+        If the file cannot be executed.
+
+    """
+
+    server_configs = runpy.run_path(filename).get("SERVER_CONFIGS")
+    if not isinstance(server_configs, list) or \
+            not all(isinstance(config, dict) and "host" in config and "port" in config for config in server_configs):
+        raise ValueError(f"{filename} does not define a valid SERVER_CONFIGS list")
+    return server_configs
+
+class ConfigWatcher:
+    """
+    Detects and loads changes of server_config.py.
+
+    Parameters
+    ----------
+    filename : str
+        Path of server_config.py.
+
+    Methods
+    -------
+    poll()
+        Return the new server configurations if the file changed since the last call.
+
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.signature = self._signature()
+
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.filename)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self) -> Optional[List[ServerConfig]]:
+        """
+        Return the new server configurations if the file changed since the last call.
+
+        A file which cannot be loaded is reported once and skipped until it changes again,
+        so that a typo does not stop the simulation.
+
+        Returns
+        -------
+        Optional[List[ServerConfig]]
+            The server configurations, None if the file did not change or cannot be loaded.
+
+        """
+
+        signature = self._signature()
+        if signature is None or signature == self.signature:
+            return None
+        self.signature = signature
+
+        try:
+            return load_server_configs(self.filename)
+        except Exception as e:
+            logging.error(f"Error reloading {self.filename}, keeping the running configuration: {e}")
+            return None
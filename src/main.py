@@ -21,6 +21,15 @@ ModbusServer
 
 Functions
 ---------
+encode_inputs(inputs)
+    Encodes TRNSYS input values into 16-bit Modbus register words.
+
+gather_inputs(input_indexes, TRNinputs)
+    Collects the TRNSYS inputs mapped to a server.
+
+scatter_outputs(values, TRNoutputs)
+    Sends register values back to the TRNSYS outputs.
+
 define_servers(server_configs)
     Initializes Modbus servers based on provided configuration.
 
@@ -33,6 +42,18 @@ StartTime(TRNData)
 Iteration(TRNData)
     Handles actions for each TRNSYS iteration within a time step.
 
+exchange_servers(servers, TRNinputs, deadline)
+    Exchanges data with all servers within a per-step I/O deadline.
+
+publish_outputs(servers, TRNoutputs)
+    Sends the cached outputs and the data-quality flags to TRNSYS.
+
+restore_servers(servers, record)
+    Restores the state of the servers from a journaled time step.
+
+apply_server_configs(new_configs)
+    Rebuilds the servers whose configuration changed while the simulation is running.
+
 EndOfTimeStep(TRNData)
     Handles end-of-time-step actions for the connected servers based on TRNData.
 
@@ -44,6 +65,24 @@ Notes
 - The module uses global variables and relies on specific configuration files (`server_config` 
   and `middleware_config`).
 - It is tailored to work with the TRNSYS simulation environment, specifically with its data handling.
+- In the steady state, a time step does not allocate memory that outlives it: the servers use
+  `__slots__` and the inputs, register words and outputs are kept in preallocated `array` buffers
+  which are reused from step to step.
+- The I/O of a time step is bounded by `STEP_DEADLINE`. Servers that miss the deadline or fail are
+  served from their last-known-good outputs, and their responses arriving later are discarded.
+- Each completed time step is recorded in the journal `JOURNAL_FILENAME`. With `RESUME` set, a
+  restarted simulation restores the last journaled state, re-pushes the last setpoints to the PLCs
+  and replays the journaled outputs of the steps already done without the `SIM_SLEEP` pacing.
+- With `SUBSTEP_INTERVAL` set, a `SubStepScheduler` streams the inputs to the PLCs and samples their
+  outputs every `SUBSTEP_INTERVAL` seconds between two time steps, and the outputs sent to TRNSYS
+  are aggregated over the previous time step.
+- Servers are reached over Modbus TCP by default, or over Modbus RTU on a serial line or through a
+  serial server (see `transports`). Servers sharing a line share a client, and their requests are
+  serialized by the scheduler of the line; runs of consecutive registers are read and written in
+  a single request on these lines.
+- With `CONFIG_RELOAD` set, changes of server_config.py are applied at the next end of time step.
+  Only the servers whose configuration changed are rebuilt; the other servers keep their connections
+  and cached outputs.
 
 
 See Also
@@ -69,17 +108,44 @@ __TRNSYS__ = "18.04.0000"
 # --------------------------------------------------------------------------
 
 # Standard library imports 
+import copy
 import time as osTime
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Dict, List, Union, Optional
 
 # Third party imports
 import logging
 from pymodbus.client import ModbusTcpClient
-from pymodbus.payload import BinaryPayloadBuilder, Endian
+from pymodbus.exceptions import ModbusException
 
 # Local imports
+import server_config
 from server_config import SERVER_CONFIGS
-from middleware_config import SIM_SLEEP, SIMULATION_MODEL, LOGGING_FILENAME
+from middleware_config import SIM_SLEEP, SIMULATION_MODEL, LOGGING_FILENAME, LOGGING_LEVEL, STEP_DEADLINE
+from middleware_config import JOURNAL_FILENAME, JOURNAL_FSYNC_EVERY, RESUME
+from middleware_config import SUBSTEP_INTERVAL, SUBSTEP_INTERPOLATION, SUBSTEP_AGGREGATE, CONFIG_RELOAD
+from config_watcher import ConfigWatcher, diff_server_configs
+from step_journal import JournalReplay, StepJournal, read_last_record
+from substep_scheduler import SubStepScheduler
+from transports import LINE_SETTINGS, coalesce, open_bus_client
+
+# --------------------------------------------------------------------------
+
+# Data-quality flags sent to TRNSYS at the `quality_index` output of a server.
+QUALITY_GOOD = 1
+QUALITY_STALE = 0
+QUALITY_NONE = -1
+
+servers = []
+server_configs = []
+watcher = None
+executor = None
+submitted = []
+journal = None
+replay = None
+scheduler = None
+step_index = 0
 
 # --------------------------------------------------------------------------
 
@@ -96,9 +162,28 @@ class ModbusServer:
     rw_registers : List[int]
         List of Modbus registers for read-write operations.
     input_indexes : List[int]
-        List of input indexes for the server.
+        List of input indexes for the server, one per rw_register. Surplus input
+        indexes are not written.
     r_registers : List[int]
         List of Modbus registers for read-only operations.
+    quality_index : Optional[int]
+        Index of the TRNSYS output receiving the data-quality flag of the server.
+    age_index : Optional[int]
+        Index of the TRNSYS output receiving the age of the server outputs in seconds.
+    aggregates : Optional[List[str]]
+        Aggregate of each r_register over a time step when sub-stepping ('last', 'mean', 'min'
+        or 'max'), `SUBSTEP_AGGREGATE` for all of them if None.
+    transport : str
+        'tcp', 'rtu' or 'rtu_over_tcp'. For 'rtu', `host` is the serial device.
+    unit : Optional[int]
+        Unit (slave) id of the device on an RTU line.
+    line : Optional[Dict[str, object]]
+        Serial settings of an RTU line (see `transports.open_bus_client`).
+
+    Raises
+    ------
+    ValueError
+        If there are fewer input indexes than rw_registers.
 
     Attributes
     ----------
@@ -112,29 +197,98 @@ class ModbusServer:
         List of input indexes for the server.
     r_registers : List[int]
         List of Modbus registers for read-only operations.
-    client : ModbusTcpClient
-        The Modbus TCP client used to communicate with the server.
+    quality_index : Optional[int]
+        Index of the TRNSYS output receiving the data-quality flag of the server.
+    age_index : Optional[int]
+        Index of the TRNSYS output receiving the age of the server outputs in seconds.
+    aggregates : Optional[List[str]]
+        Aggregate of each r_register over a time step when sub-stepping.
+    transport : str
+        'tcp', 'rtu' or 'rtu_over_tcp'.
+    unit : Optional[int]
+        Unit (slave) id of the device on an RTU line.
+    line : Dict[str, object]
+        Serial settings of an RTU line.
+    client : Union[ModbusTcpClient, BusClient]
+        The Modbus TCP client, or the client of the device on a shared RTU line.
+    read_blocks : Optional[List[Block]]
+        Runs of consecutive r_registers read in a single request, None to read one register per request.
+    write_blocks : Optional[List[Block]]
+        Runs of consecutive rw_registers written in a single request, None to write one register per request.
+    inputs : array
+        Buffer for the TRNSYS inputs of the server, one double per input index.
+    words : array
+        Buffer for the encoded register words, one unsigned 16-bit word per rw_register.
+    read_buffer : array
+        Buffer for the values of the r_registers read in the current exchange.
+    last_outputs : Optional[array]
+        The last-known-good values of the r_registers, None before the first successful read.
+    last_good : Optional[float]
+        Monotonic time of the last successful exchange.
+    quality : int
+        Data-quality flag of the outputs (`QUALITY_GOOD`, `QUALITY_STALE` or `QUALITY_NONE`).
+    pending : Optional[Future]
+        The exchange submitted to the executor and not consumed yet.
 
     Methods
     -------
     connect()
         Establish a connection to the Modbus server.
+    gather(TRNinputs)
+        Collect the TRNSYS inputs of the server into the `inputs` buffer.
     write_inputs(inputs)
         Write inputs to the Modbus server.
+    read_registers()
+        Read the r_registers from the Modbus server.
     read_outputs(TRNData)
         Read outputs from the Modbus server and update TRNData.
+    exchange(inputs)
+        Write inputs and read the r_registers in one go.
+    accept_outputs(now, values)
+        Store the values read in the last exchange as last-known-good outputs.
+    mark_stale()
+        Flag the cached outputs as stale.
     close_connection()
         Close the connection to the Modbus server.
 
     """
 
-    def __init__(self, host: str, port: int, rw_registers: Optional[List[int]], input_indexes: List[int], r_registers: Optional[List[int]]):
+    __slots__ = ("host", "port", "rw_registers", "input_indexes", "r_registers", "quality_index", "age_index", "aggregates",
+                 "transport", "unit", "line", "client", "read_blocks", "write_blocks",
+                 "inputs", "words", "read_buffer", "last_outputs", "last_good", "quality", "pending")
+
+    def __init__(self, host: str, port: int, rw_registers: Optional[List[int]], input_indexes: List[int], r_registers: Optional[List[int]],
+                 quality_index: Optional[int] = None, age_index: Optional[int] = None, aggregates: Optional[List[str]] = None,
+                 transport: str = "tcp", unit: Optional[int] = None, line: Optional[Dict[str, object]] = None):
+        n_registers, n_inputs = len(rw_registers or []), len(input_indexes or [])
+        if n_inputs < n_registers:
+            raise ValueError(f"{host}:{port} has {n_registers} rw_registers but only {n_inputs} input_indexes")
+        if n_inputs > n_registers:
+            logging.warning(f"{host}:{port} has {n_inputs} input_indexes but only {n_registers} rw_registers, "
+                            f"the inputs without a register are not written")
+
         self.host = host
         self.port = port
         self.rw_registers = rw_registers
         self.input_indexes = input_indexes
         self.r_registers = r_registers
+        self.quality_index = quality_index
+        self.age_index = age_index
+        self.aggregates = aggregates
+        self.transport = transport
+        self.unit = unit
+        self.line = line or {}
         self.client = None
+        # Requests are packed into runs of consecutive registers on shared RTU lines only.
+        self.read_blocks = None if transport == "tcp" else coalesce(r_registers)
+        self.write_blocks = None if transport == "tcp" else coalesce(rw_registers)
+        self.inputs = array('d', [0.0]) * len(input_indexes or [])
+        self.words = array('H', [0]) * len(rw_registers or [])
+        self.read_buffer = array('H', [0]) * len(r_registers or [])
+        self.last_outputs = None
+        self.last_good = None
+        self.quality = QUALITY_NONE
+        self.pending = None
 
     def open_connection(self)-> None:
         """
@@ -148,15 +302,39 @@ class ModbusServer:
         """
 
         try:
-            self.client = ModbusTcpClient(host=self.host, port=self.port)
+            if self.transport == "tcp":
+                self.client = ModbusTcpClient(host=self.host, port=self.port)
+            else:
+                self.client = open_bus_client(self.transport, self.host, self.port, self.unit, self.line)
         except Exception as e:
             logging.error(f"Error initializing Modbus client for {self.host}:{self.port}: {e}")
             raise
 
-    def write_inputs(self, inputs: List[Union[int, float]]) -> List[Union[int, float]]:
+    def gather(self, TRNinputs: List[Union[int, float]]) -> array:
+        """
+        Collect the TRNSYS inputs of the server into the `inputs` buffer.
+
+        Parameters
+        ----------
+        TRNinputs : List[Union[int, float]]
+            The inputs of the simulation model in the current time step.
+
+        Returns
+        -------
+        array
+            The `inputs` buffer.
+
+        """
+
+        gather_inputs(self.input_indexes, TRNinputs, self.inputs)
+        return self.inputs
+
+    def write_inputs(self, inputs: List[Union[int, float]]) -> Optional[List[Union[int, float]]]:
         """
         Write inputs to the Modbus server.
 
+        All registers are written even if one of them fails; errors are logged.
+
         Parameters
         ----------
         inputs : List[Union[int, float]]
@@ -164,35 +342,35 @@ class ModbusServer:
 
         Returns
         -------
-        List[Union[int, float]]
-            The list of inputs that were written.
-
-        Raises
-        ------
-        Exception
-            If an error occurs during the write operation.
+        Optional[List[Union[int, float]]]
+            The list of inputs that were written, None if a register could not be written.
 
         """
 
         try:
             client = self.client
-            builder = BinaryPayloadBuilder(byteorder=Endian.Big, wordorder=Endian.Big)
-            builder.reset()
-
-            for index, value in enumerate(inputs):
-                inputConverted = int(value * 10)
-                builder.add_16bit_int(inputConverted)
-
-            payload = builder.to_registers()
+            payload = encode_inputs(inputs, self.words)
+            failed = False
+
+            if self.write_blocks is not None:
+                for address, position, count in self.write_blocks:
+                    result = client.write_registers(address, payload[position:position + count].tolist())
+                    if result.isError():
+                        failed = True
+                        logging.error("Error writing to PLC registers %s-%s for %s:%s: %s", address + 1, address + count, self.host, self.port, result)
+                    else:
+                        logging.info("Successfully wrote %s to PLC registers %s-%s for %s:%s", inputs[position:position + count], address + 1, address + count, self.host, self.port)
+                return None if failed else inputs
 
             for indexRW, addressRW in enumerate(self.rw_registers):
                 result = client.write_registers(addressRW-1, payload[indexRW])  # starts from 0
                 if result.isError():
-                    logging.error(f"Error writing to PLC register for {self.host}:{self.port}: {result}")
+                    failed = True
+                    logging.error("Error writing to PLC register for %s:%s: %s", self.host, self.port, result)
                 else:
-                    logging.info(f"Successfully wrote {inputs[indexRW]} to PLC register {addressRW} for {self.host}:{self.port}")
+                    logging.info("Successfully wrote %s to PLC register %s for %s:%s", inputs[indexRW], addressRW, self.host, self.port)
 
-            return inputs
+            return None if failed else inputs
 
         except Exception as e:
             logging.error(f"Error writing to PLC register for {self.host}:{self.port}: {e}")
@@ -213,21 +391,121 @@ class ModbusServer:
 
         """
 
-        arrayOfResponses = []
-        
         try: 
-            for addressR in self.r_registers:
-                responseR = self.client.read_holding_registers(addressR-1)
-                registerValue = responseR.getRegister(0)
-                arrayOfResponses.append(registerValue)
+            arrayOfResponses = self.read_registers()
 
             # Send response to TRNSYS.
-            for indexR, addressR in enumerate(self.r_registers):
-                TRNData[SIMULATION_MODEL]["outputs"][indexR] = arrayOfResponses[indexR]
+            scatter_outputs(arrayOfResponses, TRNData[SIMULATION_MODEL]["outputs"])
 
         except Exception as e:
             logging.error(f"Error writing to TRNSYS from {self.host}:{self.port}: {e}")
 
+    def read_registers(self) -> array:
+        """
+        Read the r_registers from the Modbus server into the `read_buffer`.
+
+        Returns
+        -------
+        array
+            The `read_buffer` holding the register values, in the order of `r_registers`.
+
+        Raises
+        ------
+        ModbusException
+            If the server answers with an error.
+        Exception
+            If an error occurs during the read operation.
+
+        """
+
+        arrayOfResponses = self.read_buffer
+
+        if self.read_blocks is not None:
+            for address, position, count in self.read_blocks:
+                response = self.client.read_holding_registers(address, count)
+                if response.isError():
+                    raise ModbusException(f"Error reading PLC registers {address + 1}-{address + count} for {self.host}:{self.port}: {response}")
+                if len(response.registers) < count:
+                    raise ModbusException(f"Short response reading PLC registers {address + 1}-{address + count} for {self.host}:{self.port}: "
+                                          f"{len(response.registers)} registers")
+                arrayOfResponses[position:position + count] = array('H', response.registers[:count])
+            return arrayOfResponses
+
+        for indexR, addressR in enumerate(self.r_registers):
+            responseR = self.client.read_holding_registers(addressR-1)
+            if responseR.isError():
+                raise ModbusException(f"Error reading PLC register {addressR} for {self.host}:{self.port}: {responseR}")
+            arrayOfResponses[indexR] = responseR.getRegister(0)
+
+        return arrayOfResponses
+
+    def exchange(self, inputs: List[Union[int, float]]) -> List[int]:
+        """
+        Write inputs to the Modbus server and read its r_registers.
+
+        This is the unit of work submitted to the executor by `exchange_servers`.
+
+        Parameters
+        ----------
+        inputs : List[Union[int, float]]
+            List of input values to be written to the server.
+
+        Returns
+        -------
+        array
+            The `read_buffer` holding the values of the r_registers, empty if the server has none.
+
+        Raises
+        ------
+        ModbusException
+            If the inputs could not be written.
+        Exception
+            If an error occurs during the read operation.
+
+        """
+
+        if self.write_inputs(inputs) is None:
+            raise ModbusException(f"Error writing the inputs to {self.host}:{self.port}")
+
+        if self.r_registers:
+            return self.read_registers()
+        return self.read_buffer
+
+    def accept_outputs(self, now: float, values: Optional[array] = None) -> None:
+        """
+        Store the values read in the last exchange as the last-known-good outputs.
+
+        The values are copied, so that a later failed read cannot corrupt the cache.
+
+        Parameters
+        ----------
+        now : float
+            Monotonic time of the exchange.
+        values : Optional[array]
+            The output values, one per r_register, such as the aggregates of a sub-stepped
+            time step. The `read_buffer` is used if None.
+
+        """
+
+        if values is None:
+            values = self.read_buffer
+        if self.last_outputs is None:
+            self.last_outputs = array('d', values)
+        else:
+            last_outputs = self.last_outputs
+            for index, value in enumerate(values):
+                last_outputs[index] = value
+        self.last_good = now
+        self.quality = QUALITY_GOOD
+
+    def mark_stale(self) -> None:
+        """
+        Flag the cached outputs as stale after a failed or late exchange.
+
+        """
+
+        self.quality = QUALITY_STALE if self.last_outputs is not None else QUALITY_NONE
+
     def close_connection(self) -> None:
         """
         Close the connection to the Modbus server.
@@ -245,6 +523,103 @@ class ModbusServer:
         except Exception as e:
             logging.error(f"Error closing Modbus connection for {self.host}:{self.port}: {e}")
 
+def encode_inputs(inputs: List[Union[int, float]], out: Optional[array] = None) -> Union[List[int], array]:
+    """
+    Encode TRNSYS input values into 16-bit Modbus register words.
+
+    Each value is scaled by 10, truncated to an integer and stored as the
+    two's complement word of a signed 16-bit integer, which is what a
+    big-endian `BinaryPayloadBuilder.add_16bit_int` produces.
+
+    Parameters
+    ----------
+    inputs : List[Union[int, float]]
+        List of input values to be encoded.
+    out : Optional[array]
+        Preallocated buffer of unsigned 16-bit words receiving the result.
+        A new list is returned if None. Inputs beyond the length of `out`
+        are not encoded.
+
+    Returns
+    -------
+    Union[List[int], array]
+        One register word per input value, `out` if it was given.
+
+    Raises
+    ------
+    ValueError
+        If a scaled value does not fit into a signed 16-bit integer.
+
+    """
+
+    if out is None:
+        out = [0] * len(inputs)
+    elif len(inputs) > len(out):
+        # The inputs without a register are not written.
+        inputs = inputs[:len(out)]
+
+    for index, value in enumerate(inputs):
+        inputConverted = int(value * 10)
+        if not -32768 <= inputConverted <= 32767:
+            raise ValueError(f"Input {value} does not fit into a 16-bit register")
+        out[index] = inputConverted & 0xFFFF
+
+    return out
+
+def gather_inputs(input_indexes: List[int], TRNinputs: List[Union[int, float]], out: Optional[array] = None) -> Union[List[Union[int, float]], array]:
+    """
+    Collect the TRNSYS inputs mapped to a server.
+
+    Parameters
+    ----------
+    input_indexes : List[int]
+        Indexes of the TRNSYS inputs assigned to the server.
+    TRNinputs : List[Union[int, float]]
+        The inputs of the simulation model in the current time step.
+    out : Optional[array]
+        Preallocated buffer with one slot per input index receiving the result.
+        A new list is returned if None.
+
+    Returns
+    -------
+    Union[List[Union[int, float]], array]
+        The selected inputs. Out-of-range indexes are skipped in a new list and
+        keep their previous value in `out`.
+
+    """
+
+    n_inputs = len(TRNinputs)
+
+    if out is not None:
+        for position, index in enumerate(input_indexes):
+            if 0 <= index < n_inputs:
+                out[position] = TRNinputs[index]
+        return out
+
+    server_inputs = []
+
+    for index in input_indexes:
+        if 0 <= index < n_inputs:
+            server_inputs.append(TRNinputs[index])
+
+    return server_inputs
+
+def scatter_outputs(values: List[Union[int, float]], TRNoutputs: List[Union[int, float]]) -> None:
+    """
+    Send register values back to the TRNSYS outputs.
+
+    Parameters
+    ----------
+    values : List[Union[int, float]]
+        The values read from the server.
+    TRNoutputs : List[Union[int, float]]
+        The outputs of the simulation model, updated in place from index 0.
+
+    """
+
+    for indexR, value in enumerate(values):
+        TRNoutputs[indexR] = value
+
 def define_servers(server_configs: List[Dict[str, Union[str, int, List[int], int, List[int]]]]) -> List[ModbusServer]:
     """
     Initialize Modbus servers based on the provided configuration.
@@ -261,17 +636,337 @@ def define_servers(server_configs: List[Dict[str, Union[str, int, List[int], int
 
     """
 
-    servers = []
-    for config in server_configs:
-        server = ModbusServer(
-            host=config['host'],
-            port=config['port'],
-            rw_registers=config['rw_registers'],
-            input_indexes=config['input_indexes'],
-            r_registers=config['r_registers']
-        )
-        servers.append(server)
-    return servers
+    return [define_server(config) for config in server_configs]
+
+def define_server(config: Dict[str, Union[str, int, List[int], int, List[int]]]) -> ModbusServer:
+    """
+    Initialize a single Modbus server based on its configuration.
+
+    Parameters
+    ----------
+    config : Dict[str, Union[str, int, List[int], int, List[int]]]
+        Dictionary containing the configuration information of the Modbus server.
+
+    Returns
+    -------
+    ModbusServer
+        The initialized ModbusServer instance, not connected yet.
+
+    """
+
+    return ModbusServer(
+        host=config['host'],
+        port=config['port'],
+        rw_registers=config['rw_registers'],
+        input_indexes=config['input_indexes'],
+        r_registers=config['r_registers'],
+        quality_index=config.get('quality_index'),
+        age_index=config.get('age_index'),
+        aggregates=config.get('aggregates'),
+        transport=config.get('transport', 'tcp'),
+        unit=config.get('unit'),
+        line={setting: config[setting] for setting in LINE_SETTINGS if setting in config}
+    )
+
+def start_executor(n_servers: int) -> None:
+    """
+    Start the thread pool running the server exchanges, one worker per server.
+
+    Parameters
+    ----------
+    n_servers : int
+        Number of servers exchanging data in a time step.
+
+    """
+
+    global executor
+
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+    executor = ThreadPoolExecutor(max_workers=max(1, n_servers), thread_name_prefix="modbus")
+
+def exchange_servers(servers: List[ModbusServer], TRNinputs: List[Union[int, float]], deadline: Optional[float]) -> None:
+    """
+    Exchange data with all servers within a per-step I/O deadline.
+
+    The exchanges run concurrently on the executor. A server which answers in time gets its
+    `last_outputs` refreshed and is flagged `QUALITY_GOOD`. A server which fails or misses the
+    deadline keeps its last-known-good outputs and is flagged `QUALITY_STALE`; its late response
+    is discarded. No new request is sent to a server while its late request is still running,
+    so that a client is never used by two threads at once.
+
+    Parameters
+    ----------
+    servers : List[ModbusServer]
+        The servers to exchange data with.
+    TRNinputs : List[Union[int, float]]
+        The inputs of the simulation model in the current time step.
+    deadline : Optional[float]
+        Maximum time in seconds to wait for the servers. If None, the servers are
+        exchanged one after another in the calling thread without a deadline.
+
+    """
+
+    if deadline is None:
+        for server in servers:
+            try:
+                server.exchange(server.gather(TRNinputs))
+                server.accept_outputs(osTime.monotonic())
+            except Exception as e:
+                logging.error("Error exchanging data with %s:%s: %s", server.host, server.port, e)
+                server.mark_stale()
+        return
+
+    if executor is None:
+        start_executor(len(servers))
+
+    submitted.clear()
+    for server in servers:
+        if server.pending is not None and not server.pending.done():
+            logging.warning("Skipping %s:%s, its previous request is still running", server.host, server.port)
+            server.mark_stale()
+            continue
+        server.pending = executor.submit(server.exchange, server.gather(TRNinputs))
+        submitted.append(server)
+
+    wait([server.pending for server in submitted], timeout=deadline)
+    now = osTime.monotonic()
+
+    for server in submitted:
+        future = server.pending
+        if not future.done():
+            logging.warning("%s:%s missed the step deadline of %s s, serving last-known-good outputs", server.host, server.port, deadline)
+            server.mark_stale()
+            continue
+
+        server.pending = None
+        try:
+            future.result()
+            server.accept_outputs(now)
+        except Exception as e:
+            logging.error("Error exchanging data with %s:%s: %s", server.host, server.port, e)
+            server.mark_stale()
+    submitted.clear()
+
+def publish_outputs(servers: List[ModbusServer], TRNoutputs: List[Union[int, float]]) -> None:
+    """
+    Send the cached outputs and the data-quality flags of the servers to TRNSYS.
+
+    Parameters
+    ----------
+    servers : List[ModbusServer]
+        The servers whose outputs are published.
+    TRNoutputs : List[Union[int, float]]
+        The outputs of the simulation model, updated in place.
+
+    """
+
+    now = osTime.monotonic()
+
+    for server in servers:
+        if server.r_registers and server.last_outputs is not None:
+            scatter_outputs(server.last_outputs, TRNoutputs)
+        if server.quality_index is not None:
+            TRNoutputs[server.quality_index] = server.quality
+        if server.age_index is not None:
+            TRNoutputs[server.age_index] = -1 if server.last_good is None else now - server.last_good
+
+def restore_servers(servers: List[ModbusServer], record: Dict[str, object]) -> int:
+    """
+    Restore the state of the servers from a journaled time step.
+
+    The inputs, register words, outputs and data quality of each server are taken from the
+    journal entry with the same host, port and unit (the n-th server of a host, port and unit
+    from the n-th entry). Entries whose register counts do not match the server are ignored.
+
+    Parameters
+    ----------
+    servers : List[ModbusServer]
+        The servers to restore.
+    record : Dict[str, object]
+        A time step read from the journal.
+
+    Returns
+    -------
+    int
+        Number of servers restored.
+
+    """
+
+    entries = {}
+    for entry in record["servers"]:
+        key = (entry["host"], entry["port"], entry.get("unit"))
+        entries.setdefault(key, []).append(entry)
+
+    now = osTime.monotonic()
+    seen = {}
+    restored = 0
+
+    for server in servers:
+        key = (server.host, server.port, server.unit)
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        candidates = entries.get(key, [])
+        if occurrence >= len(candidates):
+            continue
+        entry = candidates[occurrence]
+        if len(entry["inputs"]) != len(server.inputs) or len(entry["words"]) != len(server.words):
+            logging.warning(f"Journal entry of {server.host}:{server.port} does not match its configuration, not restored")
+            continue
+
+        server.inputs[:] = array('d', entry["inputs"])
+        server.words[:] = array('H', entry["words"])
+        if entry["outputs"] is not None and len(entry["outputs"]) == len(server.read_buffer):
+            server.last_outputs = array('d', entry["outputs"])
+        server.quality = entry["quality"]
+        server.last_good = now if server.quality == QUALITY_GOOD else None
+        restored += 1
+
+    return restored
+
+def resume_from_journal(servers: List[ModbusServer]) -> None:
+    """
+    Resume a simulation from the last completed time step in the journal.
+
+    The state of the servers is restored, the last setpoints are written to the PLCs again
+    and the replay of the journaled time steps is set up for `EndOfTimeStep`.
+
+    Parameters
+    ----------
+    servers : List[ModbusServer]
+        The connected servers.
+
+    """
+
+    global replay
+
+    record = read_last_record(JOURNAL_FILENAME)
+    if record is None:
+        logging.info(f"No completed time step in {JOURNAL_FILENAME}, starting from the beginning")
+        return
+
+    restored = restore_servers(servers, record)
+    for server in servers:
+        server.mark_stale()
+        if server.rw_registers:
+            server.write_inputs(server.inputs)
+
+    replay = JournalReplay(JOURNAL_FILENAME, record["step"])
+    logging.info(f"Resuming after time step {record['step']}: restored {restored} of {len(servers)} servers, "
+                 f"replaying the journaled steps without pacing")
+
+def apply_server_configs(new_configs: List[Dict[str, Union[str, int, List[int], int, List[int]]]]) -> None:
+    """
+    Rebuild the servers whose configuration changed while the simulation is running.
+
+    The new configurations are compared with the live ones by host, port and unit. Unchanged
+    servers are kept as they are. Changed servers are rebuilt on the connection of the old server,
+    unless their transport settings changed, and keep its cached outputs if their r_registers did
+    not change. Added servers are connected and removed servers are disconnected. The old servers
+    are disconnected before the new ones are connected, so that a shared RTU line is reopened with
+    its new serial settings once all its devices have released it. The executor and the sub-step
+    scheduler are resized to the new set of servers. Nothing is changed if the new configuration
+    is invalid, for example if the devices of a line have different serial settings.
+
+    Parameters
+    ----------
+    new_configs : List[Dict[str, Union[str, int, List[int], int, List[int]]]]
+        The server configurations loaded from the changed server_config.py.
+
+    Raises
+    ------
+    Exception
+        If a server of the new configuration cannot be set up.
+
+    """
+
+    global servers, server_configs, scheduler
+
+    diff = diff_server_configs(server_configs, new_configs)
+    if not diff and all(old_index == new_index for old_index, new_index in diff.unchanged):
+        return
+
+    new_servers = [None] * len(new_configs)
+    for old_index, new_index in diff.unchanged:
+        new_servers[new_index] = servers[old_index]
+    reconnected = []
+    cached = []
+    for old_index, new_index in diff.changed:
+        old_server = servers[old_index]
+        server = define_server(new_configs[new_index])
+        if (server.transport, server.unit, server.line) == (old_server.transport, old_server.unit, old_server.line):
+            # A late exchange may still be using the connection, the new server waits for it.
+            server.client = old_server.client
+            server.pending = old_server.pending
+        else:
+            reconnected.append((old_index, new_index))
+        if server.r_registers == old_server.r_registers:
+            cached.append((old_index, new_index))
+        new_servers[new_index] = server
+    for new_index in diff.added:
+        new_servers[new_index] = define_server(new_configs[new_index])
+
+    new_scheduler = None
+    if scheduler is not None:
+        new_scheduler = SubStepScheduler(new_servers, SUBSTEP_INTERVAL, SUBSTEP_INTERPOLATION, SUBSTEP_AGGREGATE)
+
+    if scheduler is not None:
+        scheduler.end_period()
+        scheduler.stop()
+    # The outputs are taken over once the last sub-steps of the period have been handed to the old servers.
+    for old_index, new_index in cached:
+        old_server, server = servers[old_index], new_servers[new_index]
+        server.last_outputs = old_server.last_outputs
+        server.last_good = old_server.last_good
+        server.quality = old_server.quality
+
+    disconnecting = diff.removed + [old_index for old_index, _ in reconnected]
+    for old_index in disconnecting:
+        servers[old_index].close_connection()
+
+    connecting = diff.added + [new_index for _, new_index in reconnected]
+    try:
+        for new_index in connecting:
+            new_servers[new_index].open_connection()
+    except Exception:
+        for new_index in connecting:
+            new_servers[new_index].close_connection()
+        for old_index in disconnecting:
+            servers[old_index].open_connection()
+        if scheduler is not None:
+            scheduler.start()
+        raise
+
+    resized = len(new_servers) != len(servers)
+    servers = new_servers
+    server_configs = copy.deepcopy(new_configs)
+    if resized and executor is not None:
+        start_executor(len(servers))
+    if new_scheduler is not None:
+        scheduler = new_scheduler
+        scheduler.start()
+
+    logging.info(f"Reloaded the server configuration: {len(diff.changed)} changed, {len(diff.added)} added, "
+                 f"{len(diff.removed)} removed, {len(diff.unchanged)} unchanged")
+
+def reload_server_configs() -> None:
+    """
+    Apply the changes of server_config.py detected by the watcher, if any.
+
+    Errors are logged and the running configuration is kept, so that a faulty edit does not
+    stop the simulation.
+
+    """
+
+    if watcher is None:
+        return
+
+    try:
+        new_configs = watcher.poll()
+        if new_configs is not None:
+            apply_server_configs(new_configs)
+    except Exception as e:
+        logging.error(f"Error applying the changes of {watcher.filename}, keeping the running configuration: {e}")
 
 # --------------------------------------------------------------------------------
 #                                   START
@@ -297,21 +992,37 @@ def Initialization(TRNData: Dict[str, Dict[str, List[Union[int, float]]]]) -> No
     Notes
     -----
     This function initializes global variable 'servers' by connecting to servers
-    based on the provided server configurations in SERVER_CONFIGS.
+    based on the provided server configurations in SERVER_CONFIGS. With `RESUME`
+    set, the state of the last completed time step is restored from the journal.
 
     """
 
-    global servers
+    global servers, server_configs, watcher, journal, scheduler, step_index
 
-    logging.basicConfig(filename=LOGGING_FILENAME, level=logging.DEBUG, format='%(asctime)s [%(levelname)s] %(message)s')
+    logging.basicConfig(filename=LOGGING_FILENAME, level=LOGGING_LEVEL, format='%(asctime)s [%(levelname)s] %(message)s')
 
     try:
-        server_configs = SERVER_CONFIGS  
+        server_configs = copy.deepcopy(SERVER_CONFIGS)
         servers = define_servers(server_configs)
+        if CONFIG_RELOAD:
+            watcher = ConfigWatcher(server_config.__file__)
 
         for server in servers:
             server.open_connection()
 
+        if STEP_DEADLINE is not None:
+            start_executor(len(servers))
+
+        if SUBSTEP_INTERVAL is not None:
+            scheduler = SubStepScheduler(servers, SUBSTEP_INTERVAL, SUBSTEP_INTERPOLATION, SUBSTEP_AGGREGATE)
+            scheduler.start()
+
+        step_index = 0
+        if JOURNAL_FILENAME is not None:
+            journal = StepJournal(JOURNAL_FILENAME, JOURNAL_FSYNC_EVERY, resume=RESUME)
+            if RESUME:
+                resume_from_journal(servers)
+
     except Exception as e:
         logging.error(f"Error during initialization: {e}")
         for server in servers:
@@ -379,26 +1090,58 @@ def EndOfTimeStep(TRNData: Dict[str, Dict[str, List[Union[int, float]]]]) -> Non
 
     Notes
     -----
-    This function iterates over connected servers, writes inputs based on the provided
-    TRNData, and reads outputs if applicable. It logs relevant information during the process.
+    This function exchanges data with the connected servers within `STEP_DEADLINE`, writing
+    inputs based on the provided TRNData and reading outputs if applicable. The outputs of
+    servers which fail or miss the deadline are served from their last-known-good values,
+    together with the per-server data-quality and age flags. It logs relevant information
+    during the process.
+
+    With `SUBSTEP_INTERVAL` set, the data exchange runs in the background between the time
+    steps: the outputs of the period which just ended are aggregated and sent to TRNSYS, and
+    a new period streaming the current inputs to the PLCs is started. Only the first time step
+    exchanges data directly, as there is no previous period.
+
+    With `CONFIG_RELOAD` set, the changes of server_config.py are applied before the data
+    exchange.
+
+    The completed step is appended to the journal. While a resumed simulation replays the
+    steps already journaled, their outputs are served from the journal without any I/O or
+    pacing.
 
     """
-    
-    try:
-    
-        for server in servers:
-            TRNinputs = TRNData[SIMULATION_MODEL]["inputs"]
-            server_inputs = []
 
-            for index in server.input_indexes:
-                if 0 <= index < len(TRNinputs):
-                    server_inputs.append(TRNinputs[index])
-            server.write_inputs(server_inputs)
+    global step_index, replay
 
-            if server.r_registers:
-                server.read_outputs(TRNData)
-        
-        logging.info(f"server_inputs: {server_inputs}")
+    step_index += 1
+    
+    try:
+        TRNinputs = TRNData[SIMULATION_MODEL]["inputs"]
+        TRNoutputs = TRNData[SIMULATION_MODEL]["outputs"]
+
+        if replay is not None:
+            record = replay.get(step_index)
+            if record is not None:
+                restore_servers(servers, record)
+                publish_outputs(servers, TRNoutputs)
+                return
+            replay.close()
+            replay = None
+            logging.info(f"Replay finished, exchanging live data from time step {step_index}")
+
+        reload_server_configs()
+
+        if scheduler is None:
+            exchange_servers(servers, TRNinputs, STEP_DEADLINE)
+        elif scheduler.active:
+            scheduler.end_period()
+            scheduler.begin_period(TRNinputs, SIM_SLEEP)
+        else:
+            exchange_servers(servers, TRNinputs, STEP_DEADLINE)
+            scheduler.begin_period(TRNinputs, SIM_SLEEP)
+        publish_outputs(servers, TRNoutputs)
+
+        if journal is not None:
+            journal.append(step_index, servers)
 
     except Exception as e:
         logging.error(f"Error during EndOfTimeStep: {e}")
@@ -433,6 +1176,16 @@ def LastCallOfSimulation(TRNData: Dict[str, Dict[str, List[Union[int, float]]]])
     """
 
     try:
+        if scheduler is not None:
+            scheduler.stop()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if journal is not None:
+            journal.close()
+        if replay is not None:
+            replay.close()
+
         for server in servers:
             server.close_connection()
         
@@ -13,11 +13,57 @@ SIM_SLEEP : int
     The sleep duration in seconds between successive end-of-time-step actions during the simulation.
     This is used to prevent overloading the system with rapid consecutive requests.
 
+STEP_DEADLINE : float or None
+    The maximum time in seconds the end-of-time-step data exchange waits for the Modbus servers.
+    Servers that miss the deadline are served from their last-known-good outputs, so that a slow PLC
+    cannot stall the TRNSYS solver. Set to None to exchange with the servers one after another
+    without a deadline.
+
 LOGGING_FILENAME : str
     The filename for the log file where all log messages related to the data exchange process are stored.
     This log file is useful for debugging and monitoring the flow of data between the TRNSYS simulation
     and the Modbus servers.
 
+LOGGING_LEVEL : str
+    The minimum level of the messages written to the log file. At 'DEBUG' or 'INFO', every register
+    written is logged, which costs time and memory at each time step with many servers. Set to
+    'WARNING' to log only deadline misses and errors.
+
+JOURNAL_FILENAME : str or None
+    The filename of the append-only journal recording the data exchanged at every time step. The journal
+    allows a crashed simulation to be resumed. Set to None to disable the journal.
+
+JOURNAL_FSYNC_EVERY : int
+    The number of time steps between two syncs of the journal to disk. Every step is handed to the operating
+    system immediately, so only a power failure can lose the unsynced steps.
+
+RESUME : bool
+    Whether to resume from the journal of a crashed run. The last journaled state is restored, the last
+    setpoints are written to the PLCs again, and the steps already journaled are replayed from the journal
+    without the `SIM_SLEEP` pacing. Set back to False to start a new run, which starts a new journal; the
+    previous journal is kept, renamed with the time of its last change.
+
+SUBSTEP_INTERVAL : float or None
+    The duration in seconds of a sub-step between two time steps, e.g. 1 or 0.1 to match the cycle of
+    the PLCs. In every sub-step, the inputs are written to the PLCs and their r_registers are read in a
+    background thread, and TRNSYS gets the outputs aggregated over the previous time step. Set to None
+    to exchange data once per time step. With many registers, set `LOGGING_LEVEL` to 'WARNING', as
+    every register written is logged in every sub-step.
+
+SUBSTEP_INTERPOLATION : str
+    How the inputs are streamed to the PLCs between two time steps: 'linear' ramps them from the values
+    of the previous time step to the current ones over `SIM_SLEEP`, 'hold' writes the current values
+    once at the start of the period.
+
+SUBSTEP_AGGREGATE : str
+    How the samples of an output are aggregated over a time step: 'last', 'mean', 'min' or 'max'.
+    A server can set one aggregate per r_register with the optional 'aggregates' key of its configuration.
+
+CONFIG_RELOAD : bool
+    Whether to apply changes of server_config.py, such as those written by server_manager.py, while the
+    simulation is running. The file is checked at every end of time step and only the servers whose
+    configuration changed are rebuilt. Set to False to use the configuration loaded at the start only.
+
 SIMULATION_MODEL : str
     The identifier for the simulation model. The name of the .tpf file with the simulation model in-use
     must be provided.
@@ -30,7 +76,16 @@ Notes
 
 """
 SIM_SLEEP = 60
+STEP_DEADLINE = 5
 LOGGING_FILENAME = 'DataExchange.log'
+LOGGING_LEVEL = 'DEBUG'
+JOURNAL_FILENAME = 'DataExchange.journal'
+JOURNAL_FSYNC_EVERY = 10
+RESUME = False
+SUBSTEP_INTERVAL = None
+SUBSTEP_INTERPOLATION = 'linear'
+SUBSTEP_AGGREGATE = 'last'
+CONFIG_RELOAD = True
 SIMULATION_MODEL = 'main'
 
 
@@ -0,0 +1,376 @@
+
+"""register_scanner.py
+
+Discover the register maps of Modbus servers.
+
+This script probes the holding registers of a list of Modbus servers and emits a
+ready-to-use `SERVER_CONFIGS` for server_config.py. The servers are scanned
+concurrently, one thread per server, reusing the connection logic of
+`ModbusServer` from main.py. Within a server, address ranges are read in blocks
+of up to `MAX_BLOCK` registers; a block that cannot be read is bisected until the
+readable registers are found, so a mostly readable address space costs a few
+requests instead of one per register. Where both halves of a block are refused,
+the block is mostly unreadable and its registers are probed one by one, so an
+unreadable address space costs about one request per register rather than two.
+The requests to each server are rate-limited, so that the scan does not disturb a
+running PLC.
+
+Writable registers are only probed on request (`--probe-writes`): each readable
+block is written back with the values just read from it, bisecting the blocks
+which are refused. Only run it on PLCs whose registers are not being changed by
+their program during the scan.
+
+Classes
+-------
+RateLimiter
+    Spaces out the requests to a single server.
+
+Functions
+---------
+parse_target(text)
+    Parses a ``host[:port]`` argument.
+find_blocks(request, first, last, limiter, max_block)
+    Bisects a register range into the blocks accepted by the server.
+scan_server(host, port, ranges, rate, probe_writes)
+    Scans the register ranges of a single server.
+scan(targets, ranges, rate, probe_writes)
+    Scans several servers concurrently.
+build_configs(results)
+    Turns scan results into `SERVER_CONFIGS` entries.
+
+Examples
+--------
+Scan registers 1 to 2000 of two PLCs and write the configuration:
+
+    $ python register_scanner.py 10.202.240.12 10.202.240.13:1502 --range 1-2000 --output server_config.py
+
+"""
+
+# Standard library imports
+import argparse
+import logging
+import sys
+import time as osTime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Local imports
+from main import ModbusServer
+from server_manager import format_server_configs, write_server_configs
+
+# --------------------------------------------------------------------------
+
+MAX_BLOCK = 125  # Modbus limit for a single read of holding registers
+MAX_WRITE_BLOCK = 123  # Modbus limit for a single write of holding registers
+LINEAR_PROBE = 4  # refused blocks of at most this many registers are probed one by one
+DEFAULT_PORT = 502
+DEFAULT_RATE = 50.0
+
+Block = Tuple[int, int]  # first and last register, inclusive, 1-based
+
+# --------------------------------------------------------------------------
+
+class RateLimiter:
+    """
+    Spaces out the requests to a single server.
+
+    Parameters
+    ----------
+    rate : Optional[float]
+        Maximum number of requests per second, unlimited if None or 0.
+
+    """
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_request = 0.0
+
+    def wait(self) -> None:
+        """
+        Block until the next request may be sent.
+
+        """
+
+        if not self.interval:
+            return
+        now = osTime.monotonic()
+        if now < self.next_request:
+            osTime.sleep(self.next_request - now)
+            now = self.next_request
+        self.next_request = now + self.interval
+
+def parse_target(text: str) -> Tuple[str, int]:
+    """
+    Parse a ``host[:port]`` argument.
+
+    Parameters
+    ----------
+    text : str
+        The host, optionally followed by the port.
+
+    Returns
+    -------
+    Tuple[str, int]
+        The host and the port, `DEFAULT_PORT` if none is given.
+
+    """
+
+    host, _, port = text.partition(':')
+    return host, int(port) if port else DEFAULT_PORT
+
+def _search(probe: Callable[[int, int], bool], start: int, end: int, accepted: List[Block]) -> None:
+    if end - start + 1 <= LINEAR_PROBE:
+        accepted.extend((register, register) for register in range(start, end + 1) if probe(register, register))
+        return
+
+    middle = (start + end) // 2
+    left, right = probe(start, middle), probe(middle + 1, end)
+    if not left and not right:
+        # Mostly unreadable: bisecting further would cost more requests than probing each register.
+        accepted.extend((register, register) for register in range(start, end + 1) if probe(register, register))
+        return
+
+    if left:
+        accepted.append((start, middle))
+    else:
+        _search(probe, start, middle, accepted)
+    if right:
+        accepted.append((middle + 1, end))
+    else:
+        _search(probe, middle + 1, end, accepted)
+
+def find_blocks(request: Callable[[int, int], bool], first: int, last: int, limiter: RateLimiter,
+                max_block: int = MAX_BLOCK) -> List[Block]:
+    """
+    Bisect a register range into the blocks accepted by the server.
+
+    The range is split into chunks of at most `max_block` registers. A chunk refused by
+    the server is split in halves until the accepted registers are isolated. When both
+    halves of a refused block are refused as well, or the block has at most `LINEAR_PROBE`
+    registers, its registers are probed one by one.
+
+    Parameters
+    ----------
+    request : Callable[[int, int], bool]
+        Sends a request for `count` registers starting at a 1-based register and
+        returns whether the server accepted it.
+    first : int
+        First register of the range, 1-based.
+    last : int
+        Last register of the range, inclusive.
+    limiter : RateLimiter
+        The rate limiter of the server.
+    max_block : int
+        Maximum number of registers of a single request, `MAX_BLOCK` for reads and
+        `MAX_WRITE_BLOCK` for writes.
+
+    Returns
+    -------
+    List[Block]
+        The accepted blocks in ascending order, adjacent blocks merged.
+
+    """
+
+    def probe(start: int, end: int) -> bool:
+        limiter.wait()
+        return request(start, end - start + 1)
+
+    accepted = []
+    for start in range(first, last + 1, max_block):
+        end = min(start + max_block - 1, last)
+        if probe(start, end):
+            accepted.append((start, end))
+        else:
+            _search(probe, start, end, accepted)
+
+    blocks = []
+    for start, end in sorted(accepted):
+        if blocks and blocks[-1][1] == start - 1:
+            blocks[-1] = (blocks[-1][0], end)
+        else:
+            blocks.append((start, end))
+    return blocks
+
+def _expand(blocks: List[Block]) -> List[int]:
+    return [register for first, last in blocks for register in range(first, last + 1)]
+
+def scan_server(host: str, port: int, ranges: List[Block], rate: Optional[float] = DEFAULT_RATE,
+                probe_writes: bool = False) -> Dict[str, object]:
+    """
+    Scan the register ranges of a single server.
+
+    Parameters
+    ----------
+    host : str
+        The IP address or hostname of the Modbus server.
+    port : int
+        The port number on which the Modbus server is listening.
+    ranges : List[Block]
+        The register ranges to scan, 1-based and inclusive.
+    rate : Optional[float]
+        Maximum number of requests per second sent to the server.
+    probe_writes : bool
+        Whether to probe which readable registers are writable.
+
+    Returns
+    -------
+    Dict[str, object]
+        The host, port, readable and writable registers, and the error which stopped
+        the scan, if any.
+
+    """
+
+    server = ModbusServer(host=host, port=port, rw_registers=[], input_indexes=[], r_registers=[])
+    limiter = RateLimiter(rate)
+    result = {"host": host, "port": port, "readable": [], "writable": [], "error": None}
+    values: Dict[int, int] = {}
+
+    def read(start: int, count: int) -> bool:
+        response = server.client.read_holding_registers(start - 1, count)
+        if response.isError():
+            return False
+        for offset, value in enumerate(response.registers[:count]):
+            values[start + offset] = value
+        return True
+
+    def write(start: int, count: int) -> bool:
+        return not server.client.write_registers(start - 1, [values[start + offset] for offset in range(count)]).isError()
+
+    try:
+        server.open_connection()
+        readable = []
+        for first, last in ranges:
+            readable.extend(find_blocks(read, first, last, limiter))
+        result["readable"] = _expand(readable)
+
+        if probe_writes:
+            writable = []
+            for first, last in readable:
+                writable.extend(find_blocks(write, first, last, limiter, MAX_WRITE_BLOCK))
+            result["writable"] = _expand(writable)
+
+    except Exception as e:
+        logging.error(f"Error scanning {host}:{port}: {e}")
+        result["error"] = str(e)
+
+    finally:
+        server.close_connection()
+
+    return result
+
+def scan(targets: List[Tuple[str, int]], ranges: List[Block], rate: Optional[float] = DEFAULT_RATE,
+         probe_writes: bool = False) -> List[Dict[str, object]]:
+    """
+    Scan several servers concurrently, one thread per server.
+
+    Parameters
+    ----------
+    targets : List[Tuple[str, int]]
+        Hosts and ports of the servers.
+    ranges : List[Block]
+        The register ranges to scan on every server.
+    rate : Optional[float]
+        Maximum number of requests per second sent to each server.
+    probe_writes : bool
+        Whether to probe which readable registers are writable.
+
+    Returns
+    -------
+    List[Dict[str, object]]
+        The results of `scan_server`, in the order of `targets`.
+
+    """
+
+    with ThreadPoolExecutor(max_workers=max(1, len(targets))) as pool:
+        return list(pool.map(lambda target: scan_server(target[0], target[1], ranges, rate, probe_writes), targets))
+
+def build_configs(results: List[Dict[str, object]], first_input: int = 0) -> List[Dict[str, object]]:
+    """
+    Turn scan results into `SERVER_CONFIGS` entries.
+
+    Writable registers become rw_registers, fed from consecutive TRNSYS input indexes
+    starting at `first_input`; the other readable registers become r_registers. Servers
+    without any readable register are left out.
+
+    Parameters
+    ----------
+    results : List[Dict[str, object]]
+        The results of `scan`.
+    first_input : int
+        The first TRNSYS input index to assign.
+
+    Returns
+    -------
+    List[Dict[str, object]]
+        The server configurations.
+
+    """
+
+    server_configs = []
+    next_input = first_input
+
+    for result in results:
+        if not result["readable"]:
+            continue
+        writable = set(result["writable"])
+        rw_registers = list(result["writable"])
+        server_configs.append({
+            "host": result["host"],
+            "port": result["port"],
+            "rw_registers": rw_registers,
+            "input_indexes": list(range(next_input, next_input + len(rw_registers))),
+            "r_registers": [register for register in result["readable"] if register not in writable],
+        })
+        next_input += len(rw_registers)
+
+    return server_configs
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Command line entry point.
+
+    Parameters
+    ----------
+    argv : Optional[Sequence[str]]
+        Command line arguments, `sys.argv[1:]` if None.
+
+    Returns
+    -------
+    int
+        0 if every server was scanned, 1 otherwise.
+
+    """
+
+    parser = argparse.ArgumentParser(description="Discover the register maps of Modbus servers.")
+    parser.add_argument("targets", nargs="+", metavar="HOST[:PORT]", help="servers to scan")
+    parser.add_argument("--range", dest="ranges", action="append", metavar="FIRST-LAST",
+                        help="registers to scan, 1-based, may be repeated (default: 1-1000)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="requests per second per server (default: %(default)s)")
+    parser.add_argument("--probe-writes", action="store_true", help="write back read values to find writable registers")
+    parser.add_argument("--first-input", type=int, default=0, help="first TRNSYS input index to assign (default: %(default)s)")
+    parser.add_argument("--output", help="write the configuration to this file instead of printing it")
+    args = parser.parse_args(argv)
+
+    ranges = []
+    for text in args.ranges or ["1-1000"]:
+        first, _, last = text.partition('-')
+        ranges.append((int(first), int(last or first)))
+
+    start = osTime.monotonic()
+    results = scan([parse_target(target) for target in args.targets], ranges, args.rate, args.probe_writes)
+    server_configs = build_configs(results, args.first_input)
+
+    for result in results:
+        status = result["error"] or f"{len(result['readable'])} readable, {len(result['writable'])} writable"
+        print(f"{result['host']}:{result['port']}: {status}", file=sys.stderr)
+    print(f"Scanned {len(results)} servers in {osTime.monotonic() - start:.1f} s", file=sys.stderr)
+
+    if args.output:
+        write_server_configs(server_configs, args.output)
+    else:
+        print(format_server_configs(server_configs))
+
+    return 1 if any(result["error"] for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,10 +5,14 @@ Manage Modbus server configurations with a graphical user interface.
 
 This script contains definitions for managing Modbus server settings
 and a GUI for easy manipulation of these configurations. It includes
-functions for adding, deleting, and modifying server configurations.
+functions for adding, deleting, and modifying server configurations,
+and for importing and exporting register maps in bulk.
 
 The output of the GUI is directed to the server_config.py, from which
-the main.py module reads the ModBus servers definitions.
+the main.py module reads the ModBus servers definitions. The file is
+written atomically, a short while after the last change, so that a
+burst of edits results in a single write and main.py never reads a
+half-written file.
 
 The `SERVER_CONFIGS` list consists of dictionaries, each representing
 the configuration of a Modbus server, including details such as host
@@ -19,9 +23,30 @@ Attributes
 SERVER_CONFIGS : list of dict
     A list containing the configurations for each Modbus server. Each
     dictionary includes the host, port, and register information.
+CONFIG_FILENAME : str
+    Path of the server_config.py file written by the GUI.
+WRITE_DELAY_MS : int
+    Delay in milliseconds between the last change and the write of
+    the configuration file.
 
 Functions
 ---------
+parse_registers(text)
+    Parses a comma-separated list of registers or ranges.
+format_server_configs(server_configs)
+    Renders `SERVER_CONFIGS` as the source of server_config.py.
+write_server_configs(server_configs, filename)
+    Atomically writes the configuration file.
+import_register_map(filename)
+    Reads server configurations from a CSV or JSON register map.
+export_register_map(server_configs, filename)
+    Writes server configurations to a CSV or JSON register map.
+server_label(config)
+    Returns the ``host:port`` label of a server, with its unit if set.
+find_conflicts(server_configs)
+    Reports overlapping registers and input indexes.
+filter_servers(server_configs, query)
+    Returns the indexes of the servers matching a search query.
 add_server()
     Adds a new server configuration to `SERVER_CONFIGS` and updates
     the configuration file.
@@ -44,6 +69,14 @@ Notes
   connections.
 - Ensure accurate and valid data entry for stable Modbus server
   communication.
+- A CSV register map has one row per register with the columns
+  `host`, `port`, `kind` (`rw` or `r`), `register` and `input_index`
+  (read-write registers only), followed by the optional server
+  settings `transport`, `unit` and the serial line settings, which
+  are left empty for the defaults. A JSON register map is a list of
+  server configurations in the `SERVER_CONFIGS` format.
+- Servers are identified by host, port and unit, so that the devices
+  sharing an RTU line are kept apart.
 
 Examples
 --------
@@ -55,44 +88,432 @@ In the GUI, add, delete, or view Modbus server configurations as needed.
 
 """
 
+# Standard library imports
+import csv
+import json
+import os
+import tempfile
+from typing import Dict, List, Union
+
+# Local imports
+from transports import LINE_SETTINGS
+
+# --------------------------------------------------------------------------
+
+CONFIG_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server_config.py")
+WRITE_DELAY_MS = 500
+
+CONFIG_HEADER = '''
+"""server_config.py
+
+This config file contains the `SERVER_CONFIGS` list, which consists of dictionaries.
+Each dictionary represents the configuration of a Modbus server, including details
+such as the host address, port number, and register information.
+
+The indexing starts at zero.
+
+This file is written by server_manager.py.
+
+"""
+
+'''
+
+SERVER_SETTINGS = ["transport", "unit", *LINE_SETTINGS]
+CSV_FIELDS = ["host", "port", "kind", "register", "input_index", *SERVER_SETTINGS]
+
+ServerConfig = Dict[str, Union[str, int, List[int]]]
+
+# --------------------------------------------------------------------------
+
+def parse_registers(text: str) -> List[int]:
+    """
+    Parse a comma-separated list of registers, indexes or inclusive ranges.
+
+    Parameters
+    ----------
+    text : str
+        The text to parse, for example ``"1,2,10-12"``.
+
+    Returns
+    -------
+    List[int]
+        The parsed numbers, ranges expanded, for example ``[1, 2, 10, 11, 12]``.
+
+    Raises
+    ------
+    ValueError
+        If an item is not a number or a range.
+
+    """
+
+    values = []
+    for item in text.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if '-' in item:
+            first, last = item.split('-', 1)
+            values.extend(range(int(first), int(last) + 1))
+        else:
+            values.append(int(item))
+    return values
+
+def _format_value(value: object) -> str:
+    return json.dumps(value) if isinstance(value, str) else repr(value)
+
+def _parse_setting(text: str) -> Union[int, float, str]:
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+def server_label(config: ServerConfig) -> str:
+    """
+    Return the label of a server, ``host:port``, followed by ``#unit`` if the unit is set.
+
+    Parameters
+    ----------
+    config : ServerConfig
+        The server configuration.
+
+    Returns
+    -------
+    str
+        The label shown in the server list and in the conflict reports.
+
+    """
+
+    label = f"{config['host']}:{config['port']}"
+    if config.get("unit") is not None:
+        label += f"#{config['unit']}"
+    return label
+
+def format_server_configs(server_configs: List[ServerConfig]) -> str:
+    """
+    Render server configurations as the source of server_config.py.
+
+    Parameters
+    ----------
+    server_configs : List[ServerConfig]
+        The server configurations.
+
+    Returns
+    -------
+    str
+        The Python source defining `SERVER_CONFIGS`.
+
+    """
+
+    lines = [CONFIG_HEADER, "SERVER_CONFIGS = ["]
+    for config in server_configs:
+        lines.append("    {")
+        lines.extend(f"        {json.dumps(key)}: {_format_value(value)}," for key, value in config.items())
+        lines.append("    },")
+    lines.append("]\n")
+    return "\n".join(lines)
+
+def write_server_configs(server_configs: List[ServerConfig], filename: str = CONFIG_FILENAME) -> None:
+    """
+    Atomically write server configurations to the configuration file.
+
+    The file is written to a temporary file in the same directory, flushed to disk and
+    renamed over the configuration file, so a reader sees either the old or the new file.
+
+    Parameters
+    ----------
+    server_configs : List[ServerConfig]
+        The server configurations.
+    filename : str
+        Path of the configuration file.
+
+    """
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_name = tempfile.mkstemp(prefix=".server_config.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as config_file:
+            config_file.write(format_server_configs(server_configs))
+            config_file.flush()
+            os.fsync(config_file.fileno())
+        os.replace(tmp_name, filename)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+def import_register_map(filename: str) -> List[ServerConfig]:
+    """
+    Read server configurations from a CSV or JSON register map.
+
+    Rows of a CSV register map are grouped by host, port and unit, in the order in
+    which the servers first appear. The server settings may be given on any of the
+    rows of a server, but must not differ between them.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the register map, the format is chosen by the `.csv` or `.json` extension.
+
+    Returns
+    -------
+    List[ServerConfig]
+        The server configurations.
+
+    Raises
+    ------
+    ValueError
+        If the file has an unknown extension or contains an invalid entry.
+
+    """
+
+    if filename.lower().endswith(".json"):
+        with open(filename) as map_file:
+            server_configs = json.load(map_file)
+        for config in server_configs:
+            for key in ("host", "port", "rw_registers", "input_indexes", "r_registers"):
+                if key not in config:
+                    raise ValueError(f"Server entry {config} is missing '{key}'")
+        return server_configs
+
+    if not filename.lower().endswith(".csv"):
+        raise ValueError(f"Unknown register map format: {filename}")
+
+    servers: Dict[tuple, ServerConfig] = {}
+    with open(filename, newline="") as map_file:
+        for line, row in enumerate(csv.DictReader(map_file), start=2):
+            try:
+                unit = (row.get("unit") or "").strip()
+                key = (row["host"].strip(), int(row["port"]), int(unit) if unit else None)
+                config = servers.setdefault(key, {"host": key[0], "port": key[1], "rw_registers": [], "input_indexes": [], "r_registers": []})
+                for setting in SERVER_SETTINGS:
+                    text = (row.get(setting) or "").strip()
+                    if not text:
+                        continue
+                    value = _parse_setting(text)
+                    if config.setdefault(setting, value) != value:
+                        raise ValueError(f"'{setting}' differs from an earlier row of {server_label(config)}")
+                kind = row["kind"].strip().lower()
+                if kind == "rw":
+                    config["rw_registers"].append(int(row["register"]))
+                    config["input_indexes"].append(int(row["input_index"]))
+                elif kind == "r":
+                    config["r_registers"].append(int(row["register"]))
+                else:
+                    raise ValueError(f"unknown kind '{row['kind']}'")
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{filename}, line {line}: {e}") from e
+    return list(servers.values())
+
+def export_register_map(server_configs: List[ServerConfig], filename: str) -> None:
+    """
+    Write server configurations to a CSV or JSON register map.
+
+    Parameters
+    ----------
+    server_configs : List[ServerConfig]
+        The server configurations.
+    filename : str
+        Path of the register map, the format is chosen by the `.csv` or `.json` extension.
+
+    Raises
+    ------
+    ValueError
+        If the file has an unknown extension.
+
+    """
+
+    if filename.lower().endswith(".json"):
+        with open(filename, "w") as map_file:
+            json.dump(server_configs, map_file, indent=4)
+        return
+
+    if not filename.lower().endswith(".csv"):
+        raise ValueError(f"Unknown register map format: {filename}")
+
+    with open(filename, "w", newline="") as map_file:
+        writer = csv.writer(map_file)
+        writer.writerow(CSV_FIELDS)
+        for config in server_configs:
+            settings = [config.get(setting, "") for setting in SERVER_SETTINGS]
+            for register, index in zip(config["rw_registers"], config["input_indexes"]):
+                writer.writerow([config["host"], config["port"], "rw", register, index, *settings])
+            for register in config["r_registers"]:
+                writer.writerow([config["host"], config["port"], "r", register, "", *settings])
+
+def find_conflicts(server_configs: List[ServerConfig]) -> List[str]:
+    """
+    Report overlapping registers and input indexes.
+
+    Registers overlap when they are used twice on the same host, port and unit, whether
+    in one server entry or in several. Input indexes overlap when the same TRNSYS input
+    is written by more than one register.
+
+    Parameters
+    ----------
+    server_configs : List[ServerConfig]
+        The server configurations.
+
+    Returns
+    -------
+    List[str]
+        A description of each conflict, empty if there are none.
+
+    """
+
+    conflicts = []
+    registers: Dict[tuple, str] = {}
+    inputs: Dict[int, str] = {}
+
+    for position, config in enumerate(server_configs):
+        label = server_label(config)
+        name = f"#{position} {label}"
+        rw_registers = config.get("rw_registers") or []
+        input_indexes = config.get("input_indexes") or []
+
+        if len(rw_registers) != len(input_indexes):
+            conflicts.append(f"{name}: {len(rw_registers)} rw_registers but {len(input_indexes)} input_indexes")
+
+        for kind, kind_registers in (("rw", rw_registers), ("r", config.get("r_registers") or [])):
+            for register in kind_registers:
+                key = (config["host"], config["port"], config.get("unit"), register)
+                owner = f"{name} ({kind})"
+                if key in registers:
+                    conflicts.append(f"register {register} of {label} is used by {registers[key]} and {owner}")
+                else:
+                    registers[key] = owner
+
+        for index in input_indexes:
+            if index in inputs:
+                conflicts.append(f"input index {index} is used by {inputs[index]} and {name}")
+            else:
+                inputs[index] = name
+
+    return conflicts
+
+def filter_servers(server_configs: List[ServerConfig], query: str) -> List[int]:
+    """
+    Return the indexes of the servers matching a search query.
+
+    Parameters
+    ----------
+    server_configs : List[ServerConfig]
+        The server configurations.
+    query : str
+        Case-insensitive text searched in the `server_label`. An empty query matches all servers.
+
+    Returns
+    -------
+    List[int]
+        Indexes into `server_configs`.
+
+    """
+
+    query = query.strip().lower()
+    if not query:
+        return list(range(len(server_configs)))
+    return [index for index, config in enumerate(server_configs) if query in server_label(config).lower()]
+
+
 if __name__ == "__main__":
-    
+
     # Standard library imports
+    import queue
+    import threading
     from typing import NoReturn
 
     # Third party imports
     import tkinter as tk
-    
+    from tkinter import filedialog, messagebox
+
     # Local imports
     from server_config import SERVER_CONFIGS
 
+    pending_write = None
+    pending_filter = None
+    validation_results = queue.Queue()
+    validation_generation = 0
+    visible_servers = []
+
+
+    def schedule_write() -> NoReturn:
+        """
+        Write the configuration file `WRITE_DELAY_MS` after the last change.
+
+        """
+        global pending_write
+        if pending_write is not None:
+            root.after_cancel(pending_write)
+        pending_write = root.after(WRITE_DELAY_MS, flush_write)
+        schedule_validation()
+
+    def flush_write() -> NoReturn:
+        """
+        Write a pending change of the configuration file immediately.
+
+        """
+        global pending_write
+        if pending_write is not None:
+            root.after_cancel(pending_write)
+            pending_write = None
+            write_server_configs(SERVER_CONFIGS)
+            status_label.config(text=f"Saved {len(SERVER_CONFIGS)} servers")
+
+    def schedule_validation() -> NoReturn:
+        """
+        Check the configurations for conflicts in a background thread.
+
+        Each check is tagged with a generation, so that a slow check of an older snapshot
+        cannot overwrite the result for the current configurations.
+
+        """
+        global validation_generation
+        validation_generation += 1
+        generation = validation_generation
+        snapshot = [dict(config) for config in SERVER_CONFIGS]
+        threading.Thread(target=lambda: validation_results.put((generation, find_conflicts(snapshot))), daemon=True).start()
+
+    def poll_validation() -> NoReturn:
+        """
+        Show the result of the latest background validation.
+
+        """
+        conflicts = None
+        while not validation_results.empty():
+            generation, result = validation_results.get_nowait()
+            if generation == validation_generation:
+                conflicts = result
+        if conflicts is not None:
+            conflicts_text.delete("1.0", tk.END)
+            conflicts_text.insert(tk.END, "\n".join(conflicts) if conflicts else "No conflicts")
+        root.after(200, poll_validation)
 
     def add_server() -> NoReturn:
         """
         Add a new server configuration to the SERVER_CONFIGS list and update the configuration file.
 
         Retrieves server details from the GUI entries, creates a dictionary for the new server,
-        appends it to SERVER_CONFIGS, and writes the updated list to the server_config.py file.
-        
-        """
-        host = host_entry.get()
-        port = port_entry.get()
-        rw_registers = rw_registers_entry.get()
-        input_indexes = input_indexes_entry.get()
-        r_registers = r_registers_entry.get()
-
-        new_server = {
-            'host': host,
-            'port': int(port),
-            'rw_registers': [] if not rw_registers else list(map(int, rw_registers.split(','))),
-            'input_indexes': list(map(int, input_indexes.split(','))),
-            'r_registers': [] if not r_registers else list(map(int, r_registers.split(',')))
-        }
+        appends it to SERVER_CONFIGS, and schedules the write of the server_config.py file.
+
+        """
+        try:
+            new_server = {
+                'host': host_entry.get().strip(),
+                'port': int(port_entry.get()),
+                'rw_registers': parse_registers(rw_registers_entry.get()),
+                'input_indexes': parse_registers(input_indexes_entry.get()),
+                'r_registers': parse_registers(r_registers_entry.get())
+            }
+        except ValueError as e:
+            messagebox.showerror("Invalid entry", str(e))
+            return
 
         SERVER_CONFIGS.append(new_server)
-        with open("server_config.py", "w") as config_file:
-            config_file.write(f"SERVER_CONFIGS = {str(SERVER_CONFIGS)}")
-        update_server_listbox()
+        if filter_servers([new_server], filter_entry.get()):
+            visible_servers.append(len(SERVER_CONFIGS) - 1)
+            servers_listbox.insert(tk.END, server_label(new_server))
+        schedule_write()
         clear_entries()
 
     def delete_selected_server() -> NoReturn:
@@ -100,47 +521,102 @@ if __name__ == "__main__":
         Delete the selected server configuration from the SERVER_CONFIGS list and update the configuration file.
 
         Identifies the selected server in the GUI listbox, removes it from SERVER_CONFIGS,
-        and writes the updated list to the server_config.py file.
-        
+        and schedules the write of the server_config.py file.
+
         """
         selected_index = servers_listbox.curselection()
         if selected_index:
-            SERVER_CONFIGS.pop(selected_index[0])
-            with open("server_config.py", "w") as config_file:
-                config_file.write(f"SERVER_CONFIGS = {str(SERVER_CONFIGS)}")
-            update_server_listbox()
+            row = selected_index[0]
+            SERVER_CONFIGS.pop(visible_servers.pop(row))
+            visible_servers[row:] = [index - 1 for index in visible_servers[row:]]
+            servers_listbox.delete(row)
+            schedule_write()
+
+    def import_servers() -> NoReturn:
+        """
+        Append the servers of a CSV or JSON register map to SERVER_CONFIGS.
+
+        """
+        filename = filedialog.askopenfilename(filetypes=[("Register maps", "*.csv *.json")])
+        if not filename:
+            return
+        try:
+            imported = import_register_map(filename)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Import failed", str(e))
+            return
+        SERVER_CONFIGS.extend(imported)
+        update_server_listbox()
+        schedule_write()
+        status_label.config(text=f"Imported {len(imported)} servers")
+
+    def export_servers() -> NoReturn:
+        """
+        Write SERVER_CONFIGS to a CSV or JSON register map.
+
+        """
+        filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv"), ("JSON", "*.json")])
+        if not filename:
+            return
+        try:
+            export_register_map(SERVER_CONFIGS, filename)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Export failed", str(e))
+            return
+        status_label.config(text=f"Exported {len(SERVER_CONFIGS)} servers")
 
     def clear_entries() -> NoReturn:
         """
         Clear all input fields in the GUI.
-        
+
         """
         host_entry.delete(0, tk.END)
         port_entry.delete(0, tk.END)
         rw_registers_entry.delete(0, tk.END)
         input_indexes_entry.delete(0, tk.END)
         r_registers_entry.delete(0, tk.END)
-        update_server_listbox()
 
     def update_server_listbox():
         """
-        Update the listbox in the GUI to display the current server configurations.
-        
+        Update the listbox in the GUI to display the server configurations matching the filter.
+
         """
+        global pending_filter
+        pending_filter = None
+        visible_servers[:] = filter_servers(SERVER_CONFIGS, filter_entry.get())
         servers_listbox.delete(0, tk.END)
-        for server in SERVER_CONFIGS:
-            servers_listbox.insert(tk.END, f"{server['host']}:{server['port']}")
+        servers_listbox.insert(tk.END, *(server_label(SERVER_CONFIGS[index]) for index in visible_servers))
+
+    def schedule_filter(*args) -> NoReturn:
+        """
+        Refilter the listbox shortly after the last keystroke in the filter field.
+
+        """
+        global pending_filter
+        if pending_filter is not None:
+            root.after_cancel(pending_filter)
+        pending_filter = root.after(150, update_server_listbox)
+
+    def close() -> NoReturn:
+        """
+        Write pending changes and close the GUI.
+
+        """
+        flush_write()
+        root.destroy()
 
     # Create the main window
     root = tk.Tk()
     root.title("Server Configuration GUI")
+    root.protocol("WM_DELETE_WINDOW", close)
 
     # Labels
     tk.Label(root, text="Host:").grid(row=0, column=0, sticky=tk.E)
     tk.Label(root, text="Port:").grid(row=1, column=0, sticky=tk.E)
-    tk.Label(root, text="RW Registers (comma-separated):").grid(row=2, column=0, sticky=tk.E)
-    tk.Label(root, text="Input Indexes (comma-separated):").grid(row=3, column=0, sticky=tk.E)
-    tk.Label(root, text="R Registers (comma-separated):").grid(row=4, column=0, sticky=tk.E)
+    tk.Label(root, text="RW Registers (e.g. 1,2,10-20):").grid(row=2, column=0, sticky=tk.E)
+    tk.Label(root, text="Input Indexes (e.g. 0,1,5-15):").grid(row=3, column=0, sticky=tk.E)
+    tk.Label(root, text="R Registers (e.g. 4,5,30-40):").grid(row=4, column=0, sticky=tk.E)
+    tk.Label(root, text="Filter:").grid(row=7, column=0, sticky=tk.E)
 
     # Entry widgets
     host_entry = tk.Entry(root)
@@ -148,15 +624,26 @@ if __name__ == "__main__":
     rw_registers_entry = tk.Entry(root)
     input_indexes_entry = tk.Entry(root)
     r_registers_entry = tk.Entry(root)
+    filter_variable = tk.StringVar()
+    filter_variable.trace_add("write", schedule_filter)
+    filter_entry = tk.Entry(root, textvariable=filter_variable)
 
     # Listbox to display current servers
-    servers_listbox = tk.Listbox(root, selectmode=tk.SINGLE, height=5)
+    servers_listbox = tk.Listbox(root, selectmode=tk.SINGLE, height=15, width=30)
+    servers_scrollbar = tk.Scrollbar(root, command=servers_listbox.yview)
+    servers_listbox.config(yscrollcommand=servers_scrollbar.set)
     update_server_listbox()
 
+    # Validation results and status
+    conflicts_text = tk.Text(root, height=6, width=80)
+    status_label = tk.Label(root, text=f"Loaded {len(SERVER_CONFIGS)} servers", anchor=tk.W)
+
     # Buttons
     add_button = tk.Button(root, text="Add Server", command=add_server)
     delete_button = tk.Button(root, text="Delete Selected", command=delete_selected_server)
     clear_button = tk.Button(root, text="Clear Entries", command=clear_entries)
+    import_button = tk.Button(root, text="Import Register Map", command=import_servers)
+    export_button = tk.Button(root, text="Export Register Map", command=export_servers)
 
     # Grid layout
     host_entry.grid(row=0, column=1)
@@ -164,12 +651,19 @@ if __name__ == "__main__":
     rw_registers_entry.grid(row=2, column=1)
     input_indexes_entry.grid(row=3, column=1)
     r_registers_entry.grid(row=4, column=1)
+    filter_entry.grid(row=7, column=1)
 
-    servers_listbox.grid(row=0, column=2, rowspan=5, padx=10, pady=10)
+    servers_listbox.grid(row=0, column=2, rowspan=8, padx=(10, 0), pady=10, sticky=tk.NS)
+    servers_scrollbar.grid(row=0, column=3, rowspan=8, pady=10, sticky=tk.NS)
     add_button.grid(row=5, column=0, pady=5)
     delete_button.grid(row=5, column=1, pady=5)
     clear_button.grid(row=6, column=0, columnspan=2, pady=5)
+    import_button.grid(row=8, column=0, pady=5)
+    export_button.grid(row=8, column=1, pady=5)
+    conflicts_text.grid(row=9, column=0, columnspan=4, padx=10, pady=5)
+    status_label.grid(row=10, column=0, columnspan=4, padx=10, sticky=tk.W)
 
     # Run the GUI
+    schedule_validation()
+    poll_validation()
     root.mainloop()
-
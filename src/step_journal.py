@@ -0,0 +1,298 @@
+
+"""step_journal.py
+
+Crash-safe journal of the completed TRNSYS time steps.
+
+This module records the data exchanged at every end of time step in an append-only
+file, one JSON line per step. A line holds the step index and, for each Modbus server,
+the inputs written, the register words written (the last-written register cache), the
+outputs read and their data quality. Lines are flushed to the operating system after
+every step and synced to disk every `fsync_every` steps, so a crash of TRNSYS or of the
+middleware loses at most the unsynced steps of a power failure, and nothing otherwise.
+
+After a crash, main.py reads the journal back to restore the state of the servers,
+re-push the last setpoints to the PLCs and replay the journaled outputs of the steps
+TRNSYS computes again, without the `SIM_SLEEP` pacing.
+
+A new run never overwrites an existing journal: it is renamed with the time of its last
+change, for example `DataExchange.journal.20240501-134502`, so that a crashed run can still
+be resumed after an accidental restart without `RESUME`.
+
+Classes
+-------
+StepJournal
+    Appends time steps to the journal.
+JournalReplay
+    Reads the journaled time steps back in order.
+
+Functions
+---------
+read_last_record(filename)
+    Returns the last complete time step of a journal.
+rotate_journal(filename)
+    Renames an existing journal out of the way of a new run.
+
+"""
+
+# Standard library imports
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+# --------------------------------------------------------------------------
+
+TAIL_CHUNK = 65536
+
+# --------------------------------------------------------------------------
+
+def _parse(line: bytes) -> Optional[Dict[str, object]]:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) and "step" in record else None
+
+def read_last_record(filename: str) -> Optional[Dict[str, object]]:
+    """
+    Return the last complete time step of a journal.
+
+    The file is read backwards from its end, so the cost does not depend on the length
+    of the run. A torn last line, left by a crash in the middle of a write, is skipped.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the journal.
+
+    Returns
+    -------
+    Optional[Dict[str, object]]
+        The last record, None if the file does not exist or holds no complete record.
+
+    """
+
+    if not os.path.exists(filename):
+        return None
+
+    with open(filename, "rb") as journal_file:
+        size = journal_file.seek(0, os.SEEK_END)
+        chunk = TAIL_CHUNK
+        while True:
+            start = max(0, size - chunk)
+            journal_file.seek(start)
+            lines = journal_file.read(size - start).split(b"\n")
+            if start > 0:
+                # The first piece may be cut by the chunk boundary.
+                lines = lines[1:]
+            for line in reversed(lines):
+                record = _parse(line)
+                if record is not None:
+                    return record
+            if start == 0:
+                return None
+            chunk *= 2
+
+def rotate_journal(filename: str) -> Optional[str]:
+    """
+    Rename an existing journal out of the way of a new run.
+
+    The journal is renamed with the time of its last change, followed by a counter if a
+    journal of the same second was rotated before.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the journal.
+
+    Returns
+    -------
+    Optional[str]
+        The new path of the journal, None if there was no journal to rotate.
+
+    """
+
+    if not os.path.exists(filename):
+        return None
+
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(os.path.getmtime(filename)))
+    rotated = f"{filename}.{stamp}"
+    counter = 1
+    while os.path.exists(rotated):
+        rotated = f"{filename}.{stamp}-{counter}"
+        counter += 1
+    os.replace(filename, rotated)
+    logging.info(f"Starting a new journal, the previous one was kept as {rotated}")
+    return rotated
+
+class StepJournal:
+    """
+    Appends completed time steps to the journal.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the journal.
+    fsync_every : int
+        Number of steps between two syncs of the journal to disk.
+    resume : bool
+        Whether to continue an existing journal. A torn last line is cut off first.
+        If False, an existing journal is rotated and a new one is started.
+
+    Methods
+    -------
+    append(step, servers)
+        Append a time step.
+    sync()
+        Flush the journal and sync it to disk.
+    close()
+        Sync and close the journal.
+
+    """
+
+    def __init__(self, filename: str, fsync_every: int = 10, resume: bool = False):
+        self.filename = filename
+        self.fsync_every = max(1, fsync_every)
+        self.unsynced = 0
+
+        if resume and os.path.exists(filename):
+            self._truncate_torn_tail()
+            self.file = open(filename, "a", encoding="utf-8")
+        else:
+            rotate_journal(filename)
+            self.file = open(filename, "w", encoding="utf-8")
+
+    def _truncate_torn_tail(self) -> None:
+        with open(self.filename, "rb+") as journal_file:
+            size = journal_file.seek(0, os.SEEK_END)
+            position = size
+            while position > 0:
+                start = max(0, position - TAIL_CHUNK)
+                journal_file.seek(start)
+                newline = journal_file.read(position - start).rfind(b"\n")
+                if newline >= 0:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position != size:
+                logging.warning(f"Discarding a torn record at the end of {self.filename}")
+                journal_file.truncate(position)
+
+    def append(self, step: int, servers: List[object]) -> None:
+        """
+        Append a time step to the journal.
+
+        Parameters
+        ----------
+        step : int
+            Index of the completed time step, starting at 1.
+        servers : List[ModbusServer]
+            The servers after the exchange of the time step.
+
+        """
+
+        record = {
+            "step": step,
+            "servers": [
+                {
+                    "host": server.host,
+                    "port": server.port,
+                    "unit": server.unit,
+                    "inputs": server.inputs.tolist(),
+                    "words": server.words.tolist(),
+                    "outputs": None if server.last_outputs is None else server.last_outputs.tolist(),
+                    "quality": server.quality,
+                }
+                for server in servers
+            ],
+        }
+        self.file.write(json.dumps(record, separators=(",", ":")))
+        self.file.write("\n")
+        self.file.flush()
+
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self) -> None:
+        """
+        Flush the journal and sync it to disk.
+
+        """
+
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    def close(self) -> None:
+        """
+        Sync and close the journal.
+
+        """
+
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+class JournalReplay:
+    """
+    Reads the journaled time steps back in order, for the replay after a resume.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the journal.
+    last_step : int
+        Last step to replay, the step of the last complete record.
+
+    Methods
+    -------
+    get(step)
+        Return the record of a step, None past the end of the replay.
+    close()
+        Close the journal.
+
+    """
+
+    def __init__(self, filename: str, last_step: int):
+        self.last_step = last_step
+        self.file = open(filename, "rb")
+        self.next_record = None
+
+    def get(self, step: int) -> Optional[Dict[str, object]]:
+        """
+        Return the record of a step.
+
+        Steps must be requested in increasing order; records of skipped steps are passed over.
+
+        Parameters
+        ----------
+        step : int
+            Index of the time step.
+
+        Returns
+        -------
+        Optional[Dict[str, object]]
+            The record, None if the step is past the last journaled step or missing.
+
+        """
+
+        if step > self.last_step or self.file.closed:
+            return None
+
+        while self.next_record is None or self.next_record["step"] < step:
+            line = self.file.readline()
+            if not line:
+                return None
+            self.next_record = _parse(line)
+
+        return self.next_record if self.next_record["step"] == step else None
+
+    def close(self) -> None:
+        """
+        Close the journal.
+
+        """
+
+        self.file.close()
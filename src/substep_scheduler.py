@@ -0,0 +1,319 @@
+
+"""substep_scheduler.py
+
+Multi-rate co-simulation: PLC-rate sub-stepping between TRNSYS time steps.
+
+A TRNSYS time step, paced by `SIM_SLEEP`, typically lasts a minute, while the PLCs control
+at a second or faster. This module runs a background loop which, between two calls of
+`EndOfTimeStep`, streams the inputs to the PLCs at a higher rate and samples their
+r_registers at the same rate. The inputs are either ramped linearly from the values of
+the previous time step to the values of the current one, or held at the current values.
+The samples of each output are aggregated over the period (last, mean, min or max) and
+handed to TRNSYS at the next time step.
+
+The loop runs in its own thread, separate from the TRNSYS hooks, on a drift-free
+schedule. At every tick it only computes the inputs of each server under the lock of the
+scheduler; the Modbus requests run outside the lock, concurrently on one worker per
+server, and hand their samples back under the lock. `EndOfTimeStep` therefore never
+waits for a PLC, and a slow PLC only misses its own sub-steps: no new sub-step is sent
+to a server while its previous one is still running. The sub-steps reuse the
+preallocated buffers of the servers and of the scheduler, so a sub-step does not
+allocate memory that outlives it. If a tick runs late, the missed sub-steps are skipped
+and counted rather than run late.
+
+Classes
+-------
+SubStepScheduler
+    Runs the sub-steps of all servers in a background thread.
+
+"""
+
+# Standard library imports
+import logging
+import threading
+import time as osTime
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Union
+
+# --------------------------------------------------------------------------
+
+AGGREGATES = ("last", "mean", "min", "max")
+INTERPOLATIONS = ("linear", "hold")
+
+# --------------------------------------------------------------------------
+
+class _ServerState:
+    """
+    Buffers of the sub-stepping of a single server.
+
+    """
+
+    __slots__ = ("server", "start", "target", "current", "kinds", "last", "total", "minimum", "maximum",
+                 "result", "samples", "errors", "missed", "written", "future")
+
+    def __init__(self, server, default_aggregate: str):
+        n_inputs = len(server.inputs)
+        n_outputs = len(server.read_buffer)
+        kinds = list(server.aggregates or [default_aggregate] * n_outputs)
+        if len(kinds) != n_outputs or any(kind not in AGGREGATES for kind in kinds):
+            raise ValueError(f"Invalid aggregates {kinds} for {server.host}:{server.port}, "
+                             f"expected one of {AGGREGATES} per r_register")
+
+        self.server = server
+        self.start = array('d', [0.0]) * n_inputs
+        self.target = array('d', [0.0]) * n_inputs
+        self.current = array('d', [0.0]) * n_inputs
+        self.kinds = [AGGREGATES.index(kind) for kind in kinds]
+        self.last = array('d', [0.0]) * n_outputs
+        self.total = array('d', [0.0]) * n_outputs
+        self.minimum = array('d', [0.0]) * n_outputs
+        self.maximum = array('d', [0.0]) * n_outputs
+        self.result = array('d', [0.0]) * n_outputs
+        self.samples = 0
+        self.errors = 0
+        self.missed = 0
+        self.written = False
+        self.future = None
+
+    def reset(self) -> None:
+        self.samples = 0
+        self.errors = 0
+        self.missed = 0
+        self.written = False
+
+    def accumulate(self, values: array) -> None:
+        first = self.samples == 0
+        for index, value in enumerate(values):
+            self.last[index] = value
+            if first:
+                self.total[index] = value
+                self.minimum[index] = value
+                self.maximum[index] = value
+            else:
+                self.total[index] += value
+                if value < self.minimum[index]:
+                    self.minimum[index] = value
+                if value > self.maximum[index]:
+                    self.maximum[index] = value
+        self.samples += 1
+
+    def aggregate(self) -> array:
+        for index, kind in enumerate(self.kinds):
+            if kind == 0:
+                self.result[index] = self.last[index]
+            elif kind == 1:
+                self.result[index] = self.total[index] / self.samples
+            elif kind == 2:
+                self.result[index] = self.minimum[index]
+            else:
+                self.result[index] = self.maximum[index]
+        return self.result
+
+class SubStepScheduler:
+    """
+    Runs the sub-steps of all servers in a background thread.
+
+    Parameters
+    ----------
+    servers : List[ModbusServer]
+        The servers to exchange data with.
+    interval : float
+        Duration of a sub-step in seconds.
+    interpolation : str
+        'linear' to ramp the inputs from the previous to the current time step over the
+        period, 'hold' to write the current inputs at the start of the period.
+    aggregate : str
+        Default aggregate of the outputs over a period: 'last', 'mean', 'min' or 'max'.
+        A server can set one aggregate per r_register in its `aggregates` setting.
+
+    Attributes
+    ----------
+    overruns : int
+        Number of ticks skipped in the current period because the loop ran late.
+
+    Methods
+    -------
+    start()
+        Start the background thread.
+    begin_period(TRNinputs, duration)
+        Start a period towards the inputs of the current time step.
+    end_period()
+        Hand the aggregated outputs of the period to the servers.
+    stop()
+        Stop the background thread.
+
+    """
+
+    def __init__(self, servers: List[object], interval: float, interpolation: str = "linear", aggregate: str = "last"):
+        if interval <= 0:
+            raise ValueError(f"The sub-step interval must be positive, got {interval}")
+        if interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Unknown interpolation '{interpolation}', expected one of {INTERPOLATIONS}")
+
+        self.interval = interval
+        self.interpolation = interpolation
+        self.states = [_ServerState(server, aggregate) for server in servers]
+        self.period_start = 0.0
+        self.period_duration = 0.0
+        self.active = False
+        self.overruns = 0
+        self._period = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    def start(self) -> None:
+        """
+        Start the background thread.
+
+        """
+
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.states)), thread_name_prefix="substep")
+        self._thread = threading.Thread(target=self._run, name="substep-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background thread, waiting for the running sub-steps to finish.
+
+        """
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            # The clients must be idle before the servers are closed or exchanged directly.
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def begin_period(self, TRNinputs: List[Union[int, float]], duration: float) -> None:
+        """
+        Start a period towards the inputs of the current time step.
+
+        Parameters
+        ----------
+        TRNinputs : List[Union[int, float]]
+            The inputs of the simulation model in the current time step.
+        duration : float
+            Duration of the period in seconds, over which the inputs are ramped.
+
+        """
+
+        with self._lock:
+            for state in self.states:
+                server = state.server
+                server.gather(TRNinputs)
+                if not self.active:
+                    # There is nothing to ramp from in the first period.
+                    state.current[:] = server.inputs
+                # The ramp starts from the inputs written last.
+                state.start[:] = state.current
+                state.target[:] = server.inputs
+                state.reset()
+            self.period_start = osTime.monotonic()
+            self.period_duration = duration
+            self.overruns = 0
+            # Sub-steps of the previous period which are still running are discarded.
+            self._period += 1
+            self.active = True
+
+    def end_period(self) -> None:
+        """
+        Hand the aggregated outputs of the period to the servers.
+
+        Servers with at least one sample get the aggregates as their last-known-good
+        outputs; servers without any sample are flagged stale. Sub-steps still running
+        are not waited for.
+
+        """
+
+        with self._lock:
+            if not self.active:
+                return
+            now = osTime.monotonic()
+            for state in self.states:
+                server = state.server
+                if state.errors:
+                    logging.warning("%d of %d sub-steps failed for %s:%s", state.errors, state.errors + state.samples,
+                                    server.host, server.port)
+                if state.missed:
+                    logging.warning("%d sub-steps were skipped for %s:%s because its previous sub-step was still running",
+                                    state.missed, server.host, server.port)
+                if not server.r_registers:
+                    server.accept_outputs(now)
+                elif state.samples:
+                    server.accept_outputs(now, state.aggregate())
+                else:
+                    server.mark_stale()
+            if self.overruns:
+                logging.warning("%d sub-steps were skipped because the scheduler ran late by more than %s s", self.overruns, self.interval)
+
+    def _run(self) -> None:
+        next_tick = osTime.monotonic()
+        while not self._stop.wait(max(0.0, next_tick - osTime.monotonic())):
+            with self._lock:
+                if self.active:
+                    self._substep(osTime.monotonic())
+
+            next_tick += self.interval
+            now = osTime.monotonic()
+            if now > next_tick:
+                missed = int((now - next_tick) / self.interval) + 1
+                self.overruns += missed
+                next_tick += missed * self.interval
+
+    def _substep(self, now: float) -> None:
+        if self.period_duration > 0:
+            fraction = min(1.0, max(0.0, (now - self.period_start) / self.period_duration))
+        else:
+            fraction = 1.0
+        if self.interpolation == "hold":
+            fraction = 1.0
+
+        for state in self.states:
+            server = state.server
+            if state.future is not None and not state.future.done():
+                # Only this server misses the sub-step; the others are not held up.
+                state.missed += 1
+                continue
+            if server.pending is not None and not server.pending.done():
+                # A late exchange of the time step still owns the client.
+                continue
+
+            write = bool(server.rw_registers) and not (state.written and fraction == 1.0)
+            if write:
+                # `current` is only changed here, and not while a sub-step of the server runs.
+                current, start, target = state.current, state.start, state.target
+                for index in range(len(current)):
+                    current[index] = start[index] + (target[index] - start[index]) * fraction
+            elif not server.r_registers:
+                continue
+            state.future = self._executor.submit(self._exchange, state, write, fraction == 1.0, self._period)
+
+    def _exchange(self, state: _ServerState, write: bool, final: bool, period: int) -> None:
+        server = state.server
+        written = failed = False
+        values = None
+        try:
+            if write:
+                written = server.write_inputs(state.current) is not None
+                failed = not written
+            if server.r_registers:
+                values = server.read_registers()
+        except Exception as e:
+            failed = True
+            logging.debug("Sub-step failed for %s:%s: %s", server.host, server.port, e)
+
+        with self._lock:
+            if period != self._period:
+                return
+            if written and final:
+                state.written = True
+            if failed:
+                state.errors += 1
+            if values is not None:
+                state.accumulate(values)
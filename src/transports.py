@@ -0,0 +1,280 @@
+
+"""transports.py
+
+Modbus transports other than plain Modbus TCP.
+
+A server of `SERVER_CONFIGS` selects its transport with the optional 'transport' key:
+
+- 'tcp' (default): Modbus TCP, one `ModbusTcpClient` per server.
+- 'rtu': Modbus RTU over a serial line. `host` is the serial device, such as '/dev/ttyUSB0'
+  or 'COM3', and `port` is not used.
+- 'rtu_over_tcp': Modbus RTU frames tunnelled through a TCP serial server. `host` and `port`
+  are those of the serial server.
+
+On RS-485 lines, every request pays the turnaround of the half-duplex bus, and the line is
+shared by all the devices behind it. All servers on the same line (the same serial device,
+or the same serial server) therefore share a single client, held by a `BusScheduler`. The
+scheduler serializes the requests of all devices on the line and sends each request as soon
+as the inter-frame gap of the previous one has elapsed: 3.5 character times, or a fixed
+1.75 ms above 19200 baud, as set by the Modbus serial line specification. Each device gets a
+`BusClient` addressing it by its unit id. RTU does not allow several requests in flight, so
+the requests are packed back to back rather than pipelined, and main.py reads and writes
+runs of consecutive registers in a single request on these transports.
+
+Classes
+-------
+BusScheduler
+    Serializes the requests of all devices sharing a line.
+BusClient
+    Client of a single device on a shared line.
+
+Functions
+---------
+frame_gap(baudrate, bytesize, parity, stopbits)
+    Returns the inter-frame gap of a serial line.
+coalesce(registers)
+    Groups runs of consecutive registers into blocks.
+open_bus_client(transport, host, port, unit, line)
+    Returns a client of a device on a shared line.
+
+"""
+
+# Standard library imports
+import threading
+import time as osTime
+from typing import Dict, List, Optional, Tuple
+
+# Third party imports
+from pymodbus import Framer
+from pymodbus.client import ModbusSerialClient, ModbusTcpClient
+
+# --------------------------------------------------------------------------
+
+TRANSPORTS = ("tcp", "rtu", "rtu_over_tcp")
+LINE_SETTINGS = ("baudrate", "bytesize", "parity", "stopbits", "timeout", "frame_gap")
+DEFAULT_UNIT = 1
+DEFAULT_BAUDRATE = 19200
+MAX_BLOCK = 123  # Modbus limit for a single write of holding registers
+
+Block = Tuple[int, int, int]  # zero-based address, position in the register list, count
+
+buses: Dict[Tuple, "BusScheduler"] = {}
+buses_lock = threading.Lock()
+
+# --------------------------------------------------------------------------
+
+def frame_gap(baudrate: int = DEFAULT_BAUDRATE, bytesize: int = 8, parity: str = "N", stopbits: int = 1) -> float:
+    """
+    Return the inter-frame gap of a serial line.
+
+    Parameters
+    ----------
+    baudrate : int
+        Baud rate of the line.
+    bytesize : int
+        Number of data bits of a character.
+    parity : str
+        'N', 'E' or 'O'.
+    stopbits : int
+        Number of stop bits of a character.
+
+    Returns
+    -------
+    float
+        3.5 character times in seconds, 1.75 ms above 19200 baud.
+
+    """
+
+    if baudrate > 19200:
+        return 0.00175
+    bits = 1 + bytesize + (0 if parity == "N" else 1) + stopbits
+    return 3.5 * bits / baudrate
+
+def coalesce(registers: Optional[List[int]]) -> List[Block]:
+    """
+    Group runs of consecutive registers into blocks, each read or written in a single request.
+
+    Parameters
+    ----------
+    registers : Optional[List[int]]
+        The registers, 1-based, in the order of the configuration.
+
+    Returns
+    -------
+    List[Block]
+        The zero-based start address, the position of the first register in `registers` and
+        the number of registers of each block, at most `MAX_BLOCK`.
+
+    """
+
+    blocks = []
+    for position, register in enumerate(registers or []):
+        if blocks:
+            address, first, count = blocks[-1]
+            if register - 1 == address + count and count < MAX_BLOCK:
+                blocks[-1] = (address, first, count + 1)
+                continue
+        blocks.append((register - 1, position, 1))
+    return blocks
+
+class BusScheduler:
+    """
+    Serializes the requests of all devices sharing a line.
+
+    Parameters
+    ----------
+    key : Tuple
+        The transport and address of the line.
+    client : Union[ModbusSerialClient, ModbusTcpClient]
+        The client of the line.
+    gap : float
+        Minimum silence between two frames on the line, in seconds.
+    line : Dict[str, object]
+        The serial settings the line was opened with.
+
+    Methods
+    -------
+    request(function, *args, **kwargs)
+        Send a request once the line is free.
+    release()
+        Drop a user of the line, closing the client after the last one.
+
+    """
+
+    def __init__(self, key: Tuple, client: object, gap: float, line: Dict[str, object]):
+        self.key = key
+        self.client = client
+        self.gap = gap
+        self.line = line
+        self.users = 0
+        self.next_frame = 0.0
+        self.lock = threading.Lock()
+
+    def request(self, function, *args, **kwargs):
+        """
+        Send a request once the line is free and the inter-frame gap has elapsed.
+
+        Parameters
+        ----------
+        function : Callable
+            A request method of the client of the line.
+
+        Returns
+        -------
+        object
+            The response of the device.
+
+        """
+
+        with self.lock:
+            delay = self.next_frame - osTime.monotonic()
+            if delay > 0:
+                osTime.sleep(delay)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.next_frame = osTime.monotonic() + self.gap
+
+    def release(self) -> None:
+        """
+        Drop a user of the line, closing the client of the line after the last one.
+
+        """
+
+        with buses_lock:
+            self.users -= 1
+            if self.users > 0:
+                return
+            if buses.get(self.key) is self:
+                del buses[self.key]
+        with self.lock:
+            self.client.close()
+
+class BusClient:
+    """
+    Client of a single device on a shared line, with the call signatures of `ModbusTcpClient`.
+
+    Parameters
+    ----------
+    bus : BusScheduler
+        The scheduler of the line.
+    unit : int
+        The unit (slave) id of the device.
+
+    """
+
+    __slots__ = ("bus", "unit", "closed")
+
+    def __init__(self, bus: BusScheduler, unit: int):
+        self.bus = bus
+        self.unit = unit
+        self.closed = False
+
+    def write_registers(self, address: int, values, **kwargs):
+        return self.bus.request(self.bus.client.write_registers, address, values, slave=self.unit, **kwargs)
+
+    def read_holding_registers(self, address: int, count: int = 1, **kwargs):
+        return self.bus.request(self.bus.client.read_holding_registers, address, count, slave=self.unit, **kwargs)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.bus.release()
+
+def open_bus_client(transport: str, host: str, port: int, unit: Optional[int], line: Dict[str, object]) -> BusClient:
+    """
+    Return a client of a device on a shared line, opening the line for its first device.
+
+    Parameters
+    ----------
+    transport : str
+        'rtu' or 'rtu_over_tcp'.
+    host : str
+        The serial device for 'rtu', the IP address or hostname of the serial server for 'rtu_over_tcp'.
+    port : int
+        The port of the serial server for 'rtu_over_tcp', not used for 'rtu'.
+    unit : Optional[int]
+        The unit (slave) id of the device, `DEFAULT_UNIT` if None.
+    line : Dict[str, object]
+        Serial settings of the line: 'baudrate', 'bytesize', 'parity', 'stopbits', 'timeout' and
+        'frame_gap' (seconds, computed from the other settings if missing). For 'rtu_over_tcp',
+        the settings describe the serial side of the serial server and only set the gap.
+
+    Returns
+    -------
+    BusClient
+        The client of the device.
+
+    Raises
+    ------
+    ValueError
+        If the transport is unknown, or if the line is open with other serial settings.
+
+    """
+
+    if transport == "rtu":
+        key = (transport, host)
+    elif transport == "rtu_over_tcp":
+        key = (transport, host, port)
+    else:
+        raise ValueError(f"Unknown transport '{transport}' for {host}:{port}, expected one of {TRANSPORTS}")
+
+    with buses_lock:
+        bus = buses.get(key)
+        if bus is None:
+            serial = {setting: line[setting] for setting in ("baudrate", "bytesize", "parity", "stopbits") if setting in line}
+            timeout = {"timeout": line["timeout"]} if "timeout" in line else {}
+            if transport == "rtu":
+                client = ModbusSerialClient(port=host, framer=Framer.RTU, **serial, **timeout)
+            else:
+                client = ModbusTcpClient(host=host, port=port, framer=Framer.RTU, **timeout)
+            gap = line.get("frame_gap")
+            bus = BusScheduler(key, client, frame_gap(**serial) if gap is None else gap, dict(line))
+            buses[key] = bus
+        elif line != bus.line:
+            # The devices of a line cannot run at different settings, and the line is only reopened
+            # with new settings once all its devices have released it.
+            raise ValueError(f"Serial settings {line} of unit {unit} on {host} differ from those of the open line {bus.line}")
+        bus.users += 1
+
+    return BusClient(bus, DEFAULT_UNIT if unit is None else unit)
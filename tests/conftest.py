@@ -0,0 +1,17 @@
+"""conftest.py
+
+Shared pytest configuration of the communication middleware tests.
+
+The modules in `src` import each other as top-level modules (for example `main` imports `server_config`
+and `transports`), as they do when TRNSYS runs `main.py` from that directory. The `src` directory is
+therefore put on the import path, so that every test module can also be run on its own.
+
+"""
+
+# Standard library imports
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
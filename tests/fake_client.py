@@ -0,0 +1,123 @@
+"""fake_client.py
+
+In-process stand-in for the pymodbus synchronous clients.
+
+The `FakeModbusClient` keeps a holding-register memory in a dictionary and answers
+`write_registers` and `read_holding_registers` the way `ModbusTcpClient` does, without
+any network traffic. It is shared by the tests and the benchmark suite so that the
+exchange hot path can be exercised at scale.
+
+Classes
+-------
+FakeResponse
+    A minimal pymodbus response carrying register values.
+FakeModbusClient
+    An in-memory Modbus client.
+
+"""
+
+# Standard library imports
+import time
+from typing import Dict, Iterable, List, Optional, Union
+
+
+class FakeResponse:
+    """
+    Minimal stand-in for a pymodbus register response.
+
+    Parameters
+    ----------
+    registers : List[int]
+        The register values carried by the response.
+    error : bool
+        Whether the response represents a Modbus exception.
+
+    """
+
+    __slots__ = ("registers", "error")
+
+    def __init__(self, registers: List[int], error: bool = False):
+        self.registers = registers
+        self.error = error
+
+    def isError(self) -> bool:
+        return self.error
+
+    def getRegister(self, index: int) -> int:
+        return self.registers[index]
+
+
+class FakeModbusClient:
+    """
+    In-memory Modbus client with the call signatures of `ModbusTcpClient`.
+
+    Parameters
+    ----------
+    memory : Optional[Dict[int, int]]
+        Initial holding-register values keyed by zero-based address.
+    latency : float
+        Seconds to sleep in every request, to emulate a slow device.
+    readable : Optional[Iterable[int]]
+        Zero-based addresses that can be read. All addresses are readable if None.
+    writable : Optional[Iterable[int]]
+        Zero-based addresses that can be written. All addresses are writable if None.
+
+    Attributes
+    ----------
+    memory : Dict[int, int]
+        The holding-register memory.
+    requests : int
+        Number of requests served so far.
+    closed : bool
+        Whether `close()` has been called.
+
+    """
+
+    def __init__(self, memory: Optional[Dict[int, int]] = None, latency: float = 0.0,
+                 readable: Optional[Iterable[int]] = None, writable: Optional[Iterable[int]] = None):
+        self.memory = dict(memory or {})
+        self.latency = latency
+        self.readable = None if readable is None else frozenset(readable)
+        self.writable = None if writable is None else frozenset(writable)
+        self.requests = 0
+        self.closed = False
+        self._ok = FakeResponse([], error=False)
+        self._failed = FakeResponse([], error=True)
+        self._single = FakeResponse([0], error=False)
+
+    def _serve(self) -> None:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def write_registers(self, address: int, values: Union[int, List[int]], slave: int = 0, **kwargs) -> FakeResponse:
+        self._serve()
+        if isinstance(values, int):
+            if self.writable is not None and address not in self.writable:
+                return self._failed
+            self.memory[address] = values
+            return self._ok
+
+        if self.writable is not None:
+            for offset in range(len(values)):
+                if address + offset not in self.writable:
+                    return self._failed
+        for offset, value in enumerate(values):
+            self.memory[address + offset] = value
+        return self._ok
+
+    def read_holding_registers(self, address: int, count: int = 1, slave: int = 0, **kwargs) -> FakeResponse:
+        self._serve()
+        if self.readable is not None:
+            for offset in range(count):
+                if address + offset not in self.readable:
+                    return self._failed
+
+        if count == 1:
+            # Reuse a single response object to keep the steady state allocation-free.
+            self._single.registers[0] = self.memory.get(address, 0)
+            return self._single
+        return FakeResponse([self.memory.get(address + offset, 0) for offset in range(count)])
+
+    def close(self) -> None:
+        self.closed = True
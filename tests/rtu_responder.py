@@ -0,0 +1,144 @@
+"""rtu_responder.py
+
+Local stand-in for the Modbus RTU devices on a serial line.
+
+The `RtuResponder` answers Modbus RTU frames on a file descriptor, such as the master side
+of a pseudo-terminal whose slave side is opened by `ModbusSerialClient`, or on a TCP
+connection for RTU over TCP. It serves several unit ids from one holding-register memory
+each, like the devices sharing an RS-485 line, and records the frames it receives.
+
+Classes
+-------
+RtuResponder
+    Answers Modbus RTU requests in a background thread.
+
+Functions
+---------
+crc16(frame)
+    Returns the Modbus CRC of a frame.
+
+"""
+
+# Standard library imports
+import os
+import select
+import socket
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+def crc16(frame: bytes) -> bytes:
+    """
+    Return the Modbus CRC of a frame, low byte first.
+
+    """
+    crc = 0xFFFF
+    for byte in frame:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return struct.pack("<H", crc)
+
+
+class RtuResponder:
+    """
+    Answers Modbus RTU read and write requests for several unit ids in a background thread.
+
+    Parameters
+    ----------
+    units : Dict[int, Dict[int, int]]
+        Holding-register memory keyed by zero-based address, for each unit id.
+    fd : Optional[int]
+        File descriptor to serve, such as the master side of a pseudo-terminal.
+    connection : Optional[socket.socket]
+        TCP connection to serve instead of a file descriptor.
+
+    Attributes
+    ----------
+    frames : List[Tuple[float, int, int]]
+        Monotonic arrival time, unit id and function code of every request received.
+    replies : List[float]
+        Monotonic time of every response sent.
+
+    """
+
+    def __init__(self, units: Dict[int, Dict[int, int]], fd: Optional[int] = None, connection: Optional[socket.socket] = None):
+        self.units = units
+        self.fd = fd
+        self.connection = connection
+        self.frames: List[Tuple[float, int, int]] = []
+        self.replies: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "RtuResponder":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _source(self):
+        return self.fd if self.connection is None else self.connection
+
+    def _recv(self) -> bytes:
+        if self.connection is None:
+            return os.read(self.fd, 512)
+        return self.connection.recv(512)
+
+    def _send(self, data: bytes) -> None:
+        if self.connection is None:
+            os.write(self.fd, data)
+        else:
+            self.connection.sendall(data)
+
+    def _run(self) -> None:
+        buffer = b""
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._source()], [], [], 0.05)
+            if not ready:
+                continue
+            try:
+                data = self._recv()
+            except OSError:
+                return
+            if not data:
+                return
+            buffer += data
+            while True:
+                length = self._frame_length(buffer)
+                if length is None or len(buffer) < length:
+                    break
+                frame, buffer = buffer[:length], buffer[length:]
+                self._answer(frame)
+
+    @staticmethod
+    def _frame_length(buffer: bytes) -> Optional[int]:
+        if len(buffer) < 2:
+            return None
+        if buffer[1] == 16:
+            return 9 + buffer[6] if len(buffer) >= 7 else None
+        return 8
+
+    def _answer(self, frame: bytes) -> None:
+        unit, function = frame[0], frame[1]
+        self.frames.append((time.monotonic(), unit, function))
+        memory = self.units.get(unit)
+        if memory is None or crc16(frame[:-2]) != frame[-2:]:
+            return  # no device answers, the client times out
+
+        address, count = struct.unpack(">HH", frame[2:6])
+        if function == 3:
+            values = [memory.get(address + offset, 0) for offset in range(count)]
+            body = bytes([unit, 3, 2 * count]) + struct.pack(f">{count}H", *values)
+        elif function == 16:
+            for offset, value in enumerate(struct.unpack(f">{count}H", frame[7:7 + 2 * count])):
+                memory[address + offset] = value
+            body = frame[:6]
+        else:
+            body = bytes([unit, function | 0x80, 1])
+        self._send(body + crc16(body))
+        self.replies.append(time.monotonic())
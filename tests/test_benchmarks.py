@@ -0,0 +1,79 @@
+"""test_benchmarks.py
+
+This module contains tests for the regression check of the benchmark suite in `benchmarks/bench_exchange.py`.
+
+The benchmarks themselves are timing runs and are not executed here; the tests only make sure that results are 
+compared against a stored baseline with the configured thresholds.
+
+Functions
+---------
+test_compare_results_flags_regression()
+    Test case for a slowdown beyond the default threshold.
+
+test_compare_results_uses_minimum()
+    Test case for comparing the fastest repeats rather than the medians.
+
+test_compare_results_uses_benchmark_threshold()
+    Test case for a per-benchmark threshold override stored in the baseline.
+
+test_run_benchmarks_quick()
+    Test case for a quick smoke run of a single benchmark.
+
+"""
+
+# Local imports
+from benchmarks.bench_exchange import compare_results, run_benchmarks
+
+
+def _result(benchmark: str, median: float) -> dict:
+    return {"benchmark": benchmark, "dimension": "registers", "size": 10, "median": median, "min": median, "loops": 1}
+
+
+def test_compare_results_flags_regression() -> None:
+    """
+    Test that a case slower than the baseline by more than the threshold is reported.
+    
+    """
+    baseline = {"results": {"encode/registers=10": _result("encode", 1.0), "decode/registers=10": _result("decode", 1.0)}}
+    results = {"encode/registers=10": _result("encode", 1.3), "decode/registers=10": _result("decode", 1.2)}
+
+    regressions = compare_results(results, baseline, threshold=0.25)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("encode/registers=10")
+
+
+def test_compare_results_uses_minimum() -> None:
+    """
+    Test that a noisy median does not count as a regression when the fastest repeat is as fast as before.
+    
+    """
+    baseline = {"results": {"encode/registers=10": _result("encode", 1.0)}}
+    noisy = dict(_result("encode", 1.05), median=2.0)
+
+    assert compare_results({"encode/registers=10": noisy}, baseline, threshold=0.25) == []
+
+
+def test_compare_results_uses_benchmark_threshold() -> None:
+    """
+    Test that the thresholds stored in the baseline override the default one.
+    
+    """
+    baseline = {
+        "results": {"write_logged/registers=10": _result("write_logged", 1.0)},
+        "thresholds": {"write_logged": 0.5},
+    }
+
+    assert compare_results({"write_logged/registers=10": _result("write_logged", 1.4)}, baseline, threshold=0.25) == []
+    assert len(compare_results({"write_logged/registers=10": _result("write_logged", 1.6)}, baseline, threshold=0.25)) == 1
+
+
+def test_run_benchmarks_quick() -> None:
+    """
+    Test that a quick run produces one result per size of the benchmark dimension.
+    
+    """
+    results = run_benchmarks(["end_of_time_step"], quick=True)
+
+    assert set(results) == {"end_of_time_step/servers=1", "end_of_time_step/servers=10"}
+    assert all(result["median"] > 0 for result in results.values())
@@ -0,0 +1,182 @@
+"""test_config_watcher.py
+
+This module contains tests for the hot reload of server_config.py in the communication middleware project.
+
+The tests compare server configurations, detect changes of a server_config.py in a temporary directory and apply a
+changed configuration to servers connected to in-process fake Modbus clients, checking that only the affected servers
+are rebuilt while the others keep their connections and cached outputs.
+
+Functions
+---------
+reload_state()
+    Pytest fixture resetting the module state of `src.main`.
+
+test_diff_server_configs()
+    Test case for the comparison of two lists of server configurations.
+
+test_watcher_detects_changes()
+    Test case for detecting and loading a changed file.
+
+test_apply_rebuilds_affected_servers_only()
+    Test case for applying a changed configuration to the live servers.
+
+test_faulty_file_keeps_running_configuration()
+    Test case for a changed file which cannot be loaded.
+
+test_apply_keeps_last_sub_steps()
+    Test case for a reload while sub-stepping.
+
+"""
+
+# Standard library imports
+import os
+import time
+
+# Third party imports
+import pytest
+from unittest.mock import patch
+
+# Local imports
+import src.main as main
+from src.config_watcher import ConfigWatcher, diff_server_configs
+from tests.fake_client import FakeModbusClient
+
+MODEL = main.SIMULATION_MODEL
+SERVER_CONFIGS = [
+    {"host": "10.0.0.1", "port": 502, "rw_registers": [1], "input_indexes": [0], "r_registers": [5]},
+    {"host": "10.0.0.2", "port": 502, "rw_registers": [1], "input_indexes": [1], "r_registers": [5]},
+    {"host": "10.0.0.3", "port": 502, "rw_registers": [1], "input_indexes": [2], "r_registers": []},
+]
+
+
+@pytest.fixture
+def reload_state():
+    """
+    Fixture connecting `src.main` to fake clients and resetting its module state afterwards.
+
+    """
+    main.server_configs = [dict(config) for config in SERVER_CONFIGS]
+    main.servers = main.define_servers(main.server_configs)
+    for server in main.servers:
+        server.client = FakeModbusClient(memory={4: 42})
+    with patch.object(main, "SIM_SLEEP", 0), patch.object(main, "STEP_DEADLINE", None), patch.object(main, "journal", None):
+        yield
+    main.servers = []
+    main.server_configs = []
+    main.watcher = None
+
+
+def _write(path, server_configs) -> None:
+    path.write_text(f"SERVER_CONFIGS = {server_configs!r}\n")
+    # Make sure the change is visible on file systems with a coarse modification time.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_diff_server_configs() -> None:
+    """
+    Test that servers are matched by host, port and occurrence.
+
+    """
+    old = SERVER_CONFIGS + [dict(SERVER_CONFIGS[0], input_indexes=[3])]
+    new = [
+        dict(SERVER_CONFIGS[0], input_indexes=[3]),
+        SERVER_CONFIGS[0],
+        dict(SERVER_CONFIGS[1], rw_registers=[2]),
+        {"host": "10.0.0.4", "port": 502, "rw_registers": [], "input_indexes": [], "r_registers": [1]},
+    ]
+
+    diff = diff_server_configs(old, new)
+
+    assert diff.unchanged == []
+    assert diff.changed == [(0, 0), (3, 1), (1, 2)]
+    assert diff.added == [3]
+    assert diff.removed == [2]
+    assert not diff_server_configs(SERVER_CONFIGS, [dict(config) for config in SERVER_CONFIGS])
+
+
+def test_watcher_detects_changes(tmp_path) -> None:
+    """
+    Test that the watcher loads the file once after every change.
+
+    """
+    path = tmp_path / "server_config.py"
+    _write(path, SERVER_CONFIGS)
+    watcher = ConfigWatcher(str(path))
+
+    assert watcher.poll() is None
+
+    _write(path, SERVER_CONFIGS[:1])
+    assert watcher.poll() == SERVER_CONFIGS[:1]
+    assert watcher.poll() is None
+
+
+def test_apply_rebuilds_affected_servers_only(reload_state) -> None:
+    """
+    Test that unchanged servers are kept, changed servers keep their connection and removed servers are closed.
+
+    """
+    TRNData = {MODEL: {"inputs": [1.0, 2.0, 3.0, 4.0], "outputs": [0.0]}}
+    main.EndOfTimeStep(TRNData)
+    unchanged, changed, removed = main.servers
+    new_configs = [
+        dict(SERVER_CONFIGS[1], input_indexes=[3]),
+        SERVER_CONFIGS[0],
+        {"host": "10.0.0.4", "port": 502, "rw_registers": [2], "input_indexes": [2], "r_registers": []},
+    ]
+
+    with patch.object(main, "ModbusTcpClient", lambda host, port: FakeModbusClient()):
+        main.apply_server_configs(new_configs)
+
+    assert main.servers[1] is unchanged
+    assert main.servers[0] is not changed
+    assert main.servers[0].client is changed.client
+    assert list(main.servers[0].last_outputs) == [42]
+    assert main.servers[0].quality == main.QUALITY_GOOD
+    assert removed.client.closed
+    assert not unchanged.client.closed
+    assert main.servers[2].host == "10.0.0.4"
+
+    main.EndOfTimeStep(TRNData)
+    assert changed.client.memory[0] == 40
+    assert main.servers[2].client.memory[1] == 30
+
+
+def test_faulty_file_keeps_running_configuration(reload_state, tmp_path) -> None:
+    """
+    Test that a file which cannot be loaded leaves the servers untouched.
+
+    """
+    path = tmp_path / "server_config.py"
+    _write(path, SERVER_CONFIGS)
+    main.watcher = ConfigWatcher(str(path))
+    live_servers = list(main.servers)
+
+    path.write_text("SERVER_CONFIGS = [\n")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 2_000_000_000))
+    main.EndOfTimeStep({MODEL: {"inputs": [1.0, 2.0, 3.0], "outputs": [0.0]}})
+
+    assert main.servers == live_servers
+    assert all(server.quality == main.QUALITY_GOOD for server in live_servers if server.r_registers)
+
+
+def test_apply_keeps_last_sub_steps(reload_state) -> None:
+    """
+    Test that a rebuilt server takes over the outputs aggregated over the sub-steps of the period before the reload.
+
+    """
+    main.servers[1].client.memory[4] = 43
+    with patch.object(main, "SUBSTEP_INTERVAL", 0.01):
+        main.scheduler = main.SubStepScheduler(main.servers, 0.01)
+        main.scheduler.start()
+        try:
+            main.scheduler.begin_period([1.0, 2.0, 3.0], 0.1)
+            time.sleep(0.15)
+            new_configs = [SERVER_CONFIGS[0], dict(SERVER_CONFIGS[1], input_indexes=[0]), SERVER_CONFIGS[2]]
+            main.apply_server_configs(new_configs)
+        finally:
+            main.scheduler.stop()
+            main.scheduler = None
+
+    assert main.servers[1].quality == main.QUALITY_GOOD
+    assert list(main.servers[1].last_outputs) == [43]
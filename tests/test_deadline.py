@@ -0,0 +1,159 @@
+"""test_deadline.py
+
+This module contains tests for the deadline-bounded end-of-time-step exchange in the communication middleware project.
+
+The tests run `EndOfTimeStep` against in-process fake Modbus clients, one of which answers slower than the step 
+deadline, and check that the step stays bounded, that late servers are served from their last-known-good outputs 
+and that the data-quality and age flags are sent to TRNSYS.
+
+Functions
+---------
+exchange_state()
+    Pytest fixture resetting the module state of `src.main`.
+
+test_slow_server_is_served_from_cache()
+    Test case for a server missing the step deadline.
+
+test_late_response_is_discarded()
+    Test case for a late response arriving after its step.
+
+test_failed_read_flags_outputs_stale()
+    Test case for a read error without a deadline.
+
+test_failed_write_flags_server_stale()
+    Test case for a write-only server whose writes fail.
+
+"""
+
+# Standard library imports
+import time
+
+# Third party imports
+import pytest
+from unittest.mock import patch
+
+# Local imports
+import src.main as main
+from tests.fake_client import FakeModbusClient
+
+MODEL = main.SIMULATION_MODEL
+
+
+@pytest.fixture
+def exchange_state():
+    """
+    Fixture stubbing out `SIM_SLEEP` and shutting down the executor started by a test.
+    
+    """
+    with patch.object(main, "SIM_SLEEP", 0):
+        yield
+    if main.executor is not None:
+        main.executor.shutdown(wait=True)
+        main.executor = None
+    main.servers = []
+
+
+def _server(latency: float, r_register: int, quality_index: int, age_index: int) -> main.ModbusServer:
+    server = main.ModbusServer(host="127.0.0.1", port=502, rw_registers=[1], input_indexes=[0], r_registers=[r_register],
+                               quality_index=quality_index, age_index=age_index)
+    server.client = FakeModbusClient(memory={r_register - 1: 42}, latency=latency)
+    return server
+
+
+def test_slow_server_is_served_from_cache(exchange_state) -> None:
+    """
+    Test that a server missing the deadline does not stall the step and keeps its cached outputs.
+    
+    """
+    fast = _server(0.0, 5, quality_index=1, age_index=2)
+    slow = _server(0.0, 6, quality_index=3, age_index=4)
+    main.servers = [fast, slow]
+    TRNData = {MODEL: {"inputs": [21.5], "outputs": [0.0] * 5}}
+
+    with patch.object(main, "STEP_DEADLINE", 0.2):
+        main.EndOfTimeStep(TRNData)
+        assert slow.quality == main.QUALITY_GOOD
+
+        slow.client.latency = 0.5
+        slow.client.memory[5] = 99
+        start = time.monotonic()
+        main.EndOfTimeStep(TRNData)
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 0.8
+    assert fast.quality == main.QUALITY_GOOD
+    assert slow.quality == main.QUALITY_STALE
+    assert list(slow.last_outputs) == [42]
+    assert TRNData[MODEL]["outputs"][1] == main.QUALITY_GOOD
+    assert TRNData[MODEL]["outputs"][3] == main.QUALITY_STALE
+    assert TRNData[MODEL]["outputs"][4] >= 0.2
+
+
+def test_late_response_is_discarded(exchange_state) -> None:
+    """
+    Test that a response arriving after its step deadline never reaches the cache.
+    
+    """
+    slow = _server(0.3, 5, quality_index=1, age_index=2)
+    main.servers = [slow]
+    TRNData = {MODEL: {"inputs": [21.5], "outputs": [0.0] * 3}}
+
+    with patch.object(main, "STEP_DEADLINE", 0.05):
+        main.EndOfTimeStep(TRNData)
+        assert slow.quality == main.QUALITY_NONE
+        assert TRNData[MODEL]["outputs"][2] == -1
+
+        # The late request is still running, the server is skipped and stays without data.
+        main.EndOfTimeStep(TRNData)
+        assert slow.client.requests == 1
+
+        time.sleep(0.8)
+        slow.client.latency = 0.0
+        main.EndOfTimeStep(TRNData)
+
+    assert slow.quality == main.QUALITY_GOOD
+    assert list(slow.last_outputs) == [42]
+
+
+def test_failed_read_flags_outputs_stale(exchange_state) -> None:
+    """
+    Test that a read error keeps the cached outputs and flags them stale, also without a deadline.
+    
+    """
+    server = _server(0.0, 5, quality_index=1, age_index=2)
+    main.servers = [server]
+    TRNData = {MODEL: {"inputs": [21.5], "outputs": [0.0] * 3}}
+
+    with patch.object(main, "STEP_DEADLINE", None):
+        main.EndOfTimeStep(TRNData)
+        server.client.readable = frozenset()
+        main.EndOfTimeStep(TRNData)
+
+    assert server.quality == main.QUALITY_STALE
+    assert TRNData[MODEL]["outputs"][0] == 42
+    assert TRNData[MODEL]["outputs"][1] == main.QUALITY_STALE
+
+
+@pytest.mark.parametrize("deadline", [None, 0.5])
+def test_failed_write_flags_server_stale(exchange_state, deadline) -> None:
+    """
+    Test that a write-only server whose writes fail is flagged stale and ages, with and without a deadline.
+    
+    """
+    server = main.ModbusServer(host="127.0.0.1", port=502, rw_registers=[1], input_indexes=[0], r_registers=[],
+                               quality_index=0, age_index=1)
+    server.client = FakeModbusClient()
+    main.servers = [server]
+    TRNData = {MODEL: {"inputs": [21.5], "outputs": [0.0] * 2}}
+
+    with patch.object(main, "STEP_DEADLINE", deadline):
+        main.EndOfTimeStep(TRNData)
+        assert server.quality == main.QUALITY_GOOD
+
+        server.client.writable = frozenset()
+        time.sleep(0.05)
+        main.EndOfTimeStep(TRNData)
+
+    assert server.quality == main.QUALITY_STALE
+    assert TRNData[MODEL]["outputs"][0] == main.QUALITY_STALE
+    assert TRNData[MODEL]["outputs"][1] >= 0.05
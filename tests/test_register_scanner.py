@@ -0,0 +1,129 @@
+"""test_register_scanner.py
+
+This module contains tests for the register-map discovery of `register_scanner.py` in the communication middleware project.
+
+The scanner is run against in-process fake Modbus clients with known readable and writable registers, and the tests 
+check that the bisection finds the register blocks with few requests and that a usable configuration is emitted.
+
+Functions
+---------
+fake_servers()
+    Pytest fixture replacing the Modbus TCP connections with fake clients.
+
+test_find_blocks_bisects_refused_ranges()
+    Test case for the bisection of a partly readable range.
+
+test_find_blocks_probes_unreadable_ranges()
+    Test case for the cost of a mostly unreadable range.
+
+test_find_blocks_limits_block_size()
+    Test case for the maximum number of registers of a request.
+
+test_scan_builds_configs()
+    Test case for a concurrent scan of two servers.
+
+test_scan_reports_unreachable_server()
+    Test case for a server which cannot be reached.
+
+"""
+
+# Third party imports
+import pytest
+from unittest.mock import patch
+
+# Local imports
+from src.register_scanner import MAX_WRITE_BLOCK, RateLimiter, ModbusServer, build_configs, find_blocks, scan
+from tests.fake_client import FakeModbusClient
+
+
+@pytest.fixture
+def fake_servers():
+    """
+    Fixture connecting each scanned ModbusServer to a fake client looked up by host.
+    
+    """
+    clients = {
+        "10.0.0.1": FakeModbusClient(readable=range(0, 20), writable=range(0, 5)),
+        "10.0.0.2": FakeModbusClient(readable=list(range(100, 110)) + [200], writable=()),
+    }
+
+    def open_connection(server):
+        if server.host not in clients:
+            raise ConnectionError("unreachable")
+        server.client = clients[server.host]
+
+    with patch.object(ModbusServer, "open_connection", open_connection):
+        yield clients
+
+
+def test_find_blocks_bisects_refused_ranges() -> None:
+    """
+    Test that refused chunks are bisected down to the accepted registers.
+    
+    """
+    client = FakeModbusClient(readable=set(range(400)) - {50, 300})
+    request = lambda start, count: not client.read_holding_registers(start - 1, count).isError()
+
+    blocks = find_blocks(request, 1, 400, RateLimiter(None))
+
+    assert blocks == [(1, 50), (52, 300), (302, 400)]
+    assert client.requests < 40
+
+    client = FakeModbusClient(readable=list(range(9, 40)) + list(range(300, 302)))
+    assert find_blocks(request, 1, 400, RateLimiter(None)) == [(10, 40), (301, 302)]
+
+
+def test_find_blocks_probes_unreadable_ranges() -> None:
+    """
+    Test that a mostly unreadable range costs about one request per register, not two.
+    
+    """
+    client = FakeModbusClient(readable=())
+    request = lambda start, count: not client.read_holding_registers(start - 1, count).isError()
+
+    assert find_blocks(request, 1, 1000, RateLimiter(None)) == []
+    assert client.requests < 1100
+
+    client = FakeModbusClient(readable=range(500, 550))
+    assert find_blocks(request, 1, 1000, RateLimiter(None)) == [(501, 550)]
+    assert client.requests < 1100
+
+
+def test_find_blocks_limits_block_size() -> None:
+    """
+    Test that no request exceeds the given block size, 123 registers for writes.
+    
+    """
+    counts = []
+    request = lambda start, count: counts.append(count) is None
+
+    assert find_blocks(request, 1, 250, RateLimiter(None), MAX_WRITE_BLOCK) == [(1, 250)]
+    assert counts == [123, 123, 4]
+
+
+def test_scan_builds_configs(fake_servers) -> None:
+    """
+    Test that writable registers become rw_registers and the rest r_registers.
+    
+    """
+    results = scan([("10.0.0.1", 502), ("10.0.0.2", 502)], [(1, 250)], rate=None, probe_writes=True)
+    server_configs = build_configs(results)
+
+    assert server_configs == [
+        {"host": "10.0.0.1", "port": 502, "rw_registers": [1, 2, 3, 4, 5], "input_indexes": [0, 1, 2, 3, 4],
+         "r_registers": list(range(6, 21))},
+        {"host": "10.0.0.2", "port": 502, "rw_registers": [], "input_indexes": [],
+         "r_registers": list(range(101, 111)) + [201]},
+    ]
+    assert all(client.closed for client in fake_servers.values())
+
+
+def test_scan_reports_unreachable_server(fake_servers) -> None:
+    """
+    Test that an unreachable server is reported and left out of the configuration.
+    
+    """
+    results = scan([("10.0.0.9", 502), ("10.0.0.2", 502)], [(1, 250)], rate=None)
+
+    assert results[0]["error"] == "unreachable"
+    assert [config["host"] for config in build_configs(results)] == ["10.0.0.2"]
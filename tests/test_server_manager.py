@@ -0,0 +1,153 @@
+"""test_server_manager.py
+
+This module contains tests for the configuration helpers of `server_manager.py` in the communication middleware project.
+
+The tests cover the parts of the server manager that do not need the Tk GUI: parsing of register lists, the atomic 
+write of server_config.py, the bulk import and export of register maps and the detection of overlapping registers 
+and input indexes.
+
+Functions
+---------
+server_configs()
+    Pytest fixture with two example server configurations.
+
+test_parse_registers_expands_ranges()
+    Test case for register lists with ranges.
+
+test_write_server_configs_round_trip()
+    Test case for writing and reading back server_config.py.
+
+test_register_map_round_trip()
+    Test case for exporting and importing CSV and JSON register maps.
+
+test_find_conflicts()
+    Test case for overlapping registers and input indexes.
+
+test_filter_servers()
+    Test case for filtering the server list.
+
+test_rtu_units_are_kept_apart()
+    Test case for several devices sharing an RTU line.
+
+"""
+
+# Standard library imports
+import os
+import runpy
+
+# Third party imports
+import pytest
+
+# Local imports
+from src.server_manager import (export_register_map, filter_servers, find_conflicts, import_register_map,
+                                parse_registers, server_label, write_server_configs)
+
+
+@pytest.fixture
+def server_configs() -> list:
+    """
+    Fixture with two example server configurations without conflicts.
+    
+    """
+    return [
+        {"host": "10.202.240.12", "port": 502, "rw_registers": [1, 2], "input_indexes": [0, 1], "r_registers": [4, 5]},
+        {"host": "10.202.240.13", "port": 502, "rw_registers": [1], "input_indexes": [2], "r_registers": []},
+    ]
+
+
+def test_parse_registers_expands_ranges() -> None:
+    """
+    Test that ranges are expanded and blanks are ignored.
+    
+    """
+    assert parse_registers("1, 2,10-12,") == [1, 2, 10, 11, 12]
+    assert parse_registers("") == []
+    with pytest.raises(ValueError):
+        parse_registers("1,a")
+
+
+def test_write_server_configs_round_trip(tmp_path, server_configs: list) -> None:
+    """
+    Test that the written configuration file defines the same SERVER_CONFIGS and leaves no temporary files.
+    
+    """
+    filename = tmp_path / "server_config.py"
+    filename.write_text("SERVER_CONFIGS = []")
+
+    write_server_configs(server_configs, str(filename))
+
+    assert runpy.run_path(str(filename))["SERVER_CONFIGS"] == server_configs
+    assert os.listdir(tmp_path) == ["server_config.py"]
+
+
+@pytest.mark.parametrize("extension", ["csv", "json"])
+def test_register_map_round_trip(tmp_path, server_configs: list, extension: str) -> None:
+    """
+    Test that an exported register map is imported back unchanged.
+    
+    """
+    filename = str(tmp_path / f"registers.{extension}")
+
+    export_register_map(server_configs, filename)
+
+    assert import_register_map(filename) == server_configs
+
+
+def test_import_register_map_rejects_invalid_rows(tmp_path) -> None:
+    """
+    Test that an invalid CSV row is reported with its line number.
+    
+    """
+    filename = tmp_path / "registers.csv"
+    filename.write_text("host,port,kind,register,input_index\n10.0.0.1,502,rw,1,0\n10.0.0.1,502,x,2,\n")
+
+    with pytest.raises(ValueError, match="line 3"):
+        import_register_map(str(filename))
+
+
+def test_find_conflicts(server_configs: list) -> None:
+    """
+    Test that overlapping registers and input indexes are reported.
+    
+    """
+    assert find_conflicts(server_configs) == []
+
+    server_configs.append({"host": "10.202.240.12", "port": 502, "rw_registers": [5], "input_indexes": [2], "r_registers": []})
+    conflicts = find_conflicts(server_configs)
+
+    assert len(conflicts) == 2
+    assert conflicts[0].startswith("register 5 of 10.202.240.12:502")
+    assert conflicts[1].startswith("input index 2")
+
+
+def test_filter_servers(server_configs: list) -> None:
+    """
+    Test that the server list is filtered by host and port.
+    
+    """
+    assert filter_servers(server_configs, "") == [0, 1]
+    assert filter_servers(server_configs, "240.13") == [1]
+    assert filter_servers(server_configs, "nothing") == []
+
+
+def test_rtu_units_are_kept_apart(tmp_path) -> None:
+    """
+    Test that devices on one RTU line are told apart by their unit, with their settings kept in a CSV register map.
+    
+    """
+    line = {"transport": "rtu", "baudrate": 19200, "parity": "E", "timeout": 0.5}
+    server_configs = [
+        dict(line, host="/dev/ttyUSB0", port=0, unit=1, rw_registers=[1], input_indexes=[0], r_registers=[2]),
+        dict(line, host="/dev/ttyUSB0", port=0, unit=2, rw_registers=[1], input_indexes=[1], r_registers=[2]),
+    ]
+
+    assert find_conflicts(server_configs) == []
+    assert [server_label(config) for config in server_configs] == ["/dev/ttyUSB0:0#1", "/dev/ttyUSB0:0#2"]
+    assert filter_servers(server_configs, "#2") == [1]
+
+    filename = str(tmp_path / "registers.csv")
+    export_register_map(server_configs, filename)
+    assert import_register_map(filename) == server_configs
+
+    server_configs[1]["unit"] = 1
+    assert find_conflicts(server_configs)[0].startswith("register 1 of /dev/ttyUSB0:0#1")
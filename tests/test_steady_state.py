@@ -0,0 +1,153 @@
+"""test_steady_state.py
+
+This module contains tests for the steady-state memory behaviour of the end-of-time-step exchange in the communication 
+middleware project.
+
+After a few warm-up steps, the exchange reuses the preallocated buffers of the servers, so running more steps must not 
+grow the Python heap. The tests measure the traced memory with `tracemalloc` around many `EndOfTimeStep` calls against 
+in-process fake Modbus clients.
+
+Functions
+---------
+steady_servers()
+    Pytest fixture with many servers connected to fake clients.
+
+test_no_heap_growth_after_warm_up()
+    Test case for the heap size over many time steps, with and without a step deadline.
+
+test_sequential_step_allocates_little()
+    Test case for the temporary allocations of a time step without a step deadline.
+
+test_encode_inputs_matches_payload_builder()
+    Test case for the encoding of inputs into register words.
+
+test_surplus_inputs_are_not_written()
+    Test case for a server with more input indexes than rw_registers.
+
+"""
+
+# Standard library imports
+import gc
+import tracemalloc
+from array import array
+
+# Third party imports
+import pytest
+from unittest.mock import patch
+from pymodbus.payload import BinaryPayloadBuilder, Endian
+
+# Local imports
+import src.main as main
+from tests.fake_client import FakeModbusClient
+
+MODEL = main.SIMULATION_MODEL
+N_SERVERS = 50
+N_REGISTERS = 10
+
+
+@pytest.fixture
+def steady_servers():
+    """
+    Fixture with `N_SERVERS` servers of `N_REGISTERS` read-write and read-only registers each.
+    
+    """
+    servers = []
+    for position in range(N_SERVERS):
+        server = main.ModbusServer(host="127.0.0.1", port=502, rw_registers=list(range(1, N_REGISTERS + 1)),
+                                   input_indexes=list(range(position, position + N_REGISTERS)),
+                                   r_registers=list(range(N_REGISTERS + 1, 2 * N_REGISTERS + 1)), quality_index=0, age_index=1)
+        server.client = FakeModbusClient()
+        servers.append(server)
+
+    with patch.object(main, "SIM_SLEEP", 0), patch.object(main, "servers", servers):
+        yield servers
+
+    if main.executor is not None:
+        main.executor.shutdown(wait=True)
+        main.executor = None
+
+
+def _trace_steps(TRNData: dict, warm_up: int = 50, steps: int = 200) -> tuple:
+    """
+    Run time steps under tracemalloc and return the heap growth and the peak above the start size.
+    
+    """
+    tracemalloc.start()
+    try:
+        # The warm-up also lets the executor start all its worker threads.
+        for _ in range(warm_up):
+            main.EndOfTimeStep(TRNData)
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+        for step in range(steps):
+            TRNData[MODEL]["inputs"][step % 10] = 20.0 + step % 7
+            main.EndOfTimeStep(TRNData)
+        gc.collect()
+
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return current - before, peak - before
+
+
+def _trn_data() -> dict:
+    return {MODEL: {"inputs": [21.5] * (N_SERVERS + N_REGISTERS), "outputs": [0.0] * N_REGISTERS}}
+
+
+@pytest.mark.parametrize("deadline", [None, 5])
+def test_no_heap_growth_after_warm_up(steady_servers, deadline) -> None:
+    """
+    Test that the heap does not grow with the number of time steps after warm-up.
+    
+    """
+    with patch.object(main, "STEP_DEADLINE", deadline):
+        growth, _ = _trace_steps(_trn_data())
+
+    assert all(server.quality == main.QUALITY_GOOD for server in steady_servers)
+    assert growth < 4096
+
+
+def test_sequential_step_allocates_little(steady_servers) -> None:
+    """
+    Test that a time step without a deadline only allocates a few short-lived objects, not per-server lists.
+    
+    """
+    with patch.object(main, "STEP_DEADLINE", None):
+        _, peak = _trace_steps(_trn_data())
+
+    assert peak < 8192
+
+
+def test_encode_inputs_matches_payload_builder() -> None:
+    """
+    Test that the encoding of inputs into a buffer matches the pymodbus payload builder.
+    
+    """
+    inputs = [21.5, -3.2, 0.0, 3276.7, -3276.8]
+    builder = BinaryPayloadBuilder(byteorder=Endian.BIG, wordorder=Endian.BIG)
+    for value in inputs:
+        builder.add_16bit_int(int(value * 10))
+
+    words = main.encode_inputs(inputs, array('H', [0]) * len(inputs))
+
+    assert list(words) == builder.to_registers()
+    with pytest.raises(ValueError):
+        main.encode_inputs([3276.8])
+
+
+def test_surplus_inputs_are_not_written() -> None:
+    """
+    Test that the inputs without a register are left out and that missing inputs are rejected.
+    
+    """
+    server = main.ModbusServer(host="127.0.0.1", port=502, rw_registers=[1, 2], input_indexes=[0, 1, 2], r_registers=[])
+    server.client = FakeModbusClient()
+
+    assert server.write_inputs(server.gather([1.0, 2.0, 3.0])) is not None
+    assert server.client.memory == {0: 10, 1: 20}
+
+    with pytest.raises(ValueError, match="input_indexes"):
+        main.ModbusServer(host="127.0.0.1", port=502, rw_registers=[1, 2], input_indexes=[0], r_registers=[])
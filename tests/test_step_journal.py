@@ -0,0 +1,165 @@
+"""test_step_journal.py
+
+This module contains tests for the crash-safe step journal and the resume mode in the communication middleware project.
+
+A first simulation run exchanges data with in-process fake Modbus clients and is interrupted without a proper shutdown, 
+leaving a torn record at the end of the journal. A second run resumes from the journal and the tests check that the 
+servers are restored, the last setpoints are written to the PLCs again and the journaled steps are replayed without 
+I/O or pacing.
+
+Functions
+---------
+journal_run()
+    Pytest fixture running the middleware against fake clients with a journal in a temporary directory.
+
+test_read_last_record_skips_torn_line()
+    Test case for reading the last record of a journal with a torn last line.
+
+test_new_run_rotates_journal()
+    Test case for a new run started next to the journal of a previous run.
+
+test_resume_restores_and_replays()
+    Test case for resuming a crashed simulation.
+
+"""
+
+# Standard library imports
+import json
+import os
+from typing import Dict
+
+# Third party imports
+import pytest
+from unittest.mock import MagicMock, patch
+
+# Local imports
+import src.main as main
+from src.step_journal import StepJournal, read_last_record, rotate_journal
+from tests.fake_client import FakeModbusClient
+
+MODEL = main.SIMULATION_MODEL
+SERVER_CONFIGS = [
+    {"host": "10.0.0.1", "port": 502, "rw_registers": [1, 2], "input_indexes": [0, 1], "r_registers": [5]},
+    {"host": "10.0.0.2", "port": 502, "rw_registers": [1], "input_indexes": [2], "r_registers": []},
+]
+
+
+@pytest.fixture
+def journal_run(tmp_path):
+    """
+    Fixture patching the configuration of `src.main` for runs against fake clients.
+
+    Yields a function starting a run with a fresh set of fake clients, keyed by host.
+    
+    """
+    journal_filename = str(tmp_path / "DataExchange.journal")
+
+    def start(resume: bool) -> Dict[str, FakeModbusClient]:
+        clients = {config["host"]: FakeModbusClient() for config in SERVER_CONFIGS}
+
+        def open_connection(server):
+            server.client = clients[server.host]
+
+        with patch.object(main.ModbusServer, "open_connection", open_connection), patch.object(main, "RESUME", resume):
+            main.Initialization({})
+        return clients
+
+    with patch.object(main, "SERVER_CONFIGS", SERVER_CONFIGS), patch.object(main, "JOURNAL_FILENAME", journal_filename), \
+         patch.object(main, "STEP_DEADLINE", None), patch.object(main.logging, "basicConfig"):
+        yield start, journal_filename
+
+    for handle in (main.journal, main.replay):
+        if handle is not None:
+            handle.close()
+    main.journal = main.replay = None
+
+
+def test_read_last_record_skips_torn_line(tmp_path) -> None:
+    """
+    Test that a torn last line is skipped when reading and cut off when the journal is continued.
+    
+    """
+    filename = str(tmp_path / "journal")
+    server = main.ModbusServer(host="10.0.0.1", port=502, rw_registers=[1], input_indexes=[0], r_registers=[])
+    journal = StepJournal(filename, fsync_every=2)
+    for step in range(1, 4):
+        journal.append(step, [server])
+    journal.file.write('{"step": 4, "servers": [{"ho')
+    journal.file.close()
+
+    assert read_last_record(filename)["step"] == 3
+
+    StepJournal(filename, resume=True).close()
+    with open(filename) as journal_file:
+        assert [json.loads(line)["step"] for line in journal_file] == [1, 2, 3]
+
+
+def test_new_run_rotates_journal(tmp_path) -> None:
+    """
+    Test that a new run keeps the journal of the previous run instead of overwriting it.
+    
+    """
+    filename = str(tmp_path / "journal")
+    server = main.ModbusServer(host="10.0.0.1", port=502, rw_registers=[1], input_indexes=[0], r_registers=[])
+    for _ in range(2):
+        journal = StepJournal(filename)
+        journal.append(1, [server])
+        journal.close()
+    StepJournal(filename).close()
+
+    rotated = sorted(name for name in os.listdir(tmp_path) if name != "journal")
+    assert len(rotated) == 2
+    assert all(read_last_record(str(tmp_path / name))["step"] == 1 for name in rotated)
+    assert read_last_record(filename) is None
+    assert rotate_journal(str(tmp_path / "missing")) is None
+
+
+def test_resume_restores_and_replays(journal_run) -> None:
+    """
+    Test that a resumed run restores the last state, re-pushes the setpoints and replays the journaled steps.
+    
+    """
+    start, journal_filename = journal_run
+    sleep = MagicMock()
+
+    # First run: three steps, then a crash in the middle of the fourth record.
+    clients = start(resume=False)
+    journaled_outputs = []
+    with patch.object(main.osTime, "sleep", sleep):
+        for step in range(3):
+            clients["10.0.0.1"].memory[4] = 100 + step
+            TRNData = {MODEL: {"inputs": [20.0 + step, 1.5, -2.0], "outputs": [0.0]}}
+            main.EndOfTimeStep(TRNData)
+            journaled_outputs.append(TRNData[MODEL]["outputs"][0])
+    main.journal.file.write('{"step": 4, "serv')
+    main.journal.file.close()
+
+    # Second run: the PLCs lost their setpoints.
+    clients = start(resume=True)
+
+    assert clients["10.0.0.1"].memory == {0: 220, 1: 15}
+    assert clients["10.0.0.2"].memory == {0: 0xFFEC}
+    assert list(main.servers[0].last_outputs) == [102]
+    assert main.servers[0].quality == main.QUALITY_STALE
+
+    requests = {host: client.requests for host, client in clients.items()}
+    sleep.reset_mock()
+    replayed_outputs = []
+    with patch.object(main.osTime, "sleep", sleep):
+        for step in range(3):
+            TRNData = {MODEL: {"inputs": [0.0, 0.0, 0.0], "outputs": [0.0]}}
+            main.EndOfTimeStep(TRNData)
+            replayed_outputs.append(TRNData[MODEL]["outputs"][0])
+
+        assert replayed_outputs == journaled_outputs
+        assert {host: client.requests for host, client in clients.items()} == requests
+        sleep.assert_not_called()
+
+        clients["10.0.0.1"].memory[4] = 200
+        TRNData = {MODEL: {"inputs": [30.0, 1.5, -2.0], "outputs": [0.0]}}
+        main.EndOfTimeStep(TRNData)
+
+    assert TRNData[MODEL]["outputs"][0] == 200
+    assert sleep.call_count == 1
+    main.journal.sync()
+    assert read_last_record(journal_filename)["step"] == 4
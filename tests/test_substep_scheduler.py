@@ -0,0 +1,228 @@
+"""test_substep_scheduler.py
+
+This module contains tests for the PLC-rate sub-stepping between TRNSYS time steps in the communication middleware project.
+
+The tests run a `SubStepScheduler` against in-process fake Modbus clients at a short sub-step interval, and check that
+the inputs are ramped between two time steps, that the outputs are sampled and aggregated over a period and that
+`EndOfTimeStep` hands the aggregates to TRNSYS.
+
+Functions
+---------
+test_inputs_are_ramped_between_steps()
+    Test case for the linear interpolation of the inputs.
+
+test_hold_writes_once_per_period()
+    Test case for the 'hold' interpolation.
+
+test_failed_hold_write_is_retried()
+    Test case for a held input whose write fails.
+
+test_outputs_are_aggregated()
+    Test case for the per-register aggregates of the outputs.
+
+test_slow_server_does_not_block()
+    Test case for a server slower than the sub-step interval.
+
+test_end_of_time_step_publishes_aggregates()
+    Test case for the sub-stepping driven by `EndOfTimeStep`.
+
+test_invalid_aggregates_are_rejected()
+    Test case for a server configuration with invalid aggregates.
+
+"""
+
+# Standard library imports
+import time
+
+# Third party imports
+import pytest
+from unittest.mock import patch
+
+# Local imports
+import src.main as main
+from src.substep_scheduler import SubStepScheduler
+from tests.fake_client import FakeModbusClient, FakeResponse
+
+MODEL = main.SIMULATION_MODEL
+
+
+class RecordingClient(FakeModbusClient):
+    """
+    Fake client recording the values written and counting up the value of every register read.
+
+    """
+
+    def __init__(self, failures: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.written = []
+        self.counter = 0
+        self.failures = failures
+
+    def write_registers(self, address, values, slave=0, **kwargs):
+        self.written.append(values)
+        if self.failures:
+            self.failures -= 1
+            return FakeResponse([], error=True)
+        return super().write_registers(address, values, slave, **kwargs)
+
+    def read_holding_registers(self, address, count=1, slave=0, **kwargs):
+        self._serve()
+        self.counter += 1
+        return FakeResponse([self.counter])
+
+
+def _server(aggregates=None, host="127.0.0.1", **kwargs) -> main.ModbusServer:
+    server = main.ModbusServer(host=host, port=502, rw_registers=[1], input_indexes=[0], r_registers=[5, 6],
+                               aggregates=aggregates)
+    server.client = RecordingClient(**kwargs)
+    return server
+
+
+def _run_period(scheduler: SubStepScheduler, inputs, duration: float) -> None:
+    scheduler.begin_period(inputs, duration)
+    time.sleep(duration + 0.05)
+
+
+def test_inputs_are_ramped_between_steps() -> None:
+    """
+    Test that the inputs are ramped from the previous to the current time step.
+
+    """
+    server = _server()
+    scheduler = SubStepScheduler([server], interval=0.01, interpolation="linear")
+    scheduler.start()
+    try:
+        _run_period(scheduler, [10.0], 0.1)
+        server.client.written.clear()
+        _run_period(scheduler, [20.0], 0.3)
+    finally:
+        scheduler.stop()
+
+    written = server.client.written
+    assert len(written) > 5
+    assert written == sorted(written)
+    assert 100 <= written[0] < 150
+    assert written[-1] == 200
+    assert len(set(written)) > 3
+
+
+def test_hold_writes_once_per_period() -> None:
+    """
+    Test that held inputs are written once per period while the outputs are still sampled.
+
+    """
+    server = _server()
+    scheduler = SubStepScheduler([server], interval=0.01, interpolation="hold")
+    scheduler.start()
+    try:
+        _run_period(scheduler, [10.0], 0.1)
+        _run_period(scheduler, [20.0], 0.1)
+    finally:
+        scheduler.stop()
+
+    assert server.client.written == [100, 200]
+    assert server.client.counter > 10
+
+
+def test_failed_hold_write_is_retried() -> None:
+    """
+    Test that a held input whose write fails is written again in the next sub-step and the failure is counted.
+
+    """
+    server = _server(failures=2)
+    scheduler = SubStepScheduler([server], interval=0.01, interpolation="hold")
+    scheduler.start()
+    try:
+        _run_period(scheduler, [10.0], 0.1)
+    finally:
+        scheduler.stop()
+
+    assert server.client.written == [100, 100, 100]
+    assert server.client.memory[0] == 100
+    assert scheduler.states[0].errors == 2
+
+
+def test_outputs_are_aggregated() -> None:
+    """
+    Test that the samples of each output are aggregated over the period with its own aggregate.
+
+    """
+    server = _server(aggregates=["mean", "max"])
+    scheduler = SubStepScheduler([server], interval=0.01)
+    scheduler.start()
+    try:
+        _run_period(scheduler, [10.0], 0.2)
+        scheduler.stop()
+        scheduler.end_period()
+    finally:
+        scheduler.stop()
+
+    state = scheduler.states[0]
+    assert state.samples > 5
+    # Both registers are read in every sub-step, so they take the odd and the even counts.
+    assert server.last_outputs[0] == pytest.approx(state.samples)
+    assert server.last_outputs[1] == server.client.counter
+    assert server.quality == main.QUALITY_GOOD
+
+
+def test_end_of_time_step_publishes_aggregates() -> None:
+    """
+    Test that `EndOfTimeStep` exchanges directly in the first time step and publishes aggregates afterwards.
+
+    """
+    server = _server(aggregates=["min", "last"])
+    TRNData = {MODEL: {"inputs": [21.5], "outputs": [0.0] * 2}}
+
+    with patch.object(main, "SIM_SLEEP", 0.2), patch.object(main, "STEP_DEADLINE", None), \
+         patch.object(main, "journal", None), patch.object(main, "servers", [server]):
+        main.scheduler = SubStepScheduler([server], interval=0.01)
+        main.scheduler.start()
+        try:
+            main.EndOfTimeStep(TRNData)
+            assert TRNData[MODEL]["outputs"] == [1, 2]
+
+            main.EndOfTimeStep(TRNData)
+        finally:
+            main.scheduler.stop()
+            main.scheduler = None
+
+    outputs = TRNData[MODEL]["outputs"]
+    assert outputs[0] == 3
+    assert outputs[1] > 10
+    assert server.client.written[0] == 215
+
+
+def test_invalid_aggregates_are_rejected() -> None:
+    """
+    Test that a server needs one known aggregate per r_register.
+
+    """
+    with pytest.raises(ValueError):
+        SubStepScheduler([_server(aggregates=["mean"])], interval=0.01)
+    with pytest.raises(ValueError):
+        SubStepScheduler([_server(aggregates=["mean", "median"])], interval=0.01)
+
+
+def test_slow_server_does_not_block() -> None:
+    """
+    Test that a server slower than the interval neither delays the end of a period nor the sub-steps of the others.
+
+    """
+    fast = _server()
+    slow = _server(host="127.0.0.2", latency=0.15)
+    scheduler = SubStepScheduler([fast, slow], interval=0.01)
+    scheduler.start()
+    try:
+        _run_period(scheduler, [10.0], 0.2)
+        started = time.monotonic()
+        scheduler.end_period()
+        elapsed = time.monotonic() - started
+    finally:
+        scheduler.stop()
+
+    assert elapsed < 0.05
+    fast_state, slow_state = scheduler.states
+    assert fast_state.samples > 10
+    assert slow_state.samples <= 1
+    assert slow_state.missed > 10
+    assert fast.quality == main.QUALITY_GOOD
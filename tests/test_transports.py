@@ -0,0 +1,259 @@
+"""test_transports.py
+
+This module contains tests for the Modbus RTU transports in the communication middleware project.
+
+The serial tests open a pseudo-terminal, serve its master side with a local Modbus RTU responder standing in for
+several devices on an RS-485 line, and connect the servers to its slave side with the 'rtu' transport. The RTU over
+TCP test serves the responder on a local TCP socket. The tests check that devices sharing a line share one client,
+that their requests are serialized with the inter-frame gap, that runs of consecutive registers are packed into
+single requests, and that a reload reopens a line with new serial settings.
+
+Functions
+---------
+serial_line()
+    Pytest fixture providing a pseudo-terminal served by an RTU responder.
+
+test_frame_gap()
+    Test case for the inter-frame gap of a serial line.
+
+test_coalesce()
+    Test case for grouping consecutive registers into blocks.
+
+test_short_block_response_is_rejected()
+    Test case for a device answering a block read with too few registers.
+
+test_rtu_devices_share_a_line()
+    Test case for two devices exchanging data over one serial line.
+
+test_rtu_requests_are_serialized()
+    Test case for concurrent exchanges on one serial line.
+
+test_rtu_over_tcp()
+    Test case for RTU frames over a TCP connection.
+
+test_reload_reopens_line()
+    Test case for a reload changing the serial settings of a line.
+
+"""
+
+# Standard library imports
+import importlib
+import importlib.util
+import os
+import socket
+import threading
+
+# Third party imports
+import pytest
+from unittest.mock import patch
+
+# Local imports
+import src.main as main
+from tests.fake_client import FakeModbusClient, FakeResponse
+from tests.rtu_responder import RtuResponder
+
+# The transports module as imported by main, which holds the registry of the open lines.
+transports = importlib.import_module(main.open_bus_client.__module__)
+
+MODEL = main.SIMULATION_MODEL
+
+requires_pty = pytest.mark.skipif(not hasattr(os, "openpty") or importlib.util.find_spec("serial") is None,
+                                  reason="needs pseudo-terminals and pyserial")
+
+
+@pytest.fixture
+def serial_line():
+    """
+    Fixture opening a pseudo-terminal whose master side is served by an RTU responder with units 1 and 2.
+
+    Yields the responder and the device name of the slave side.
+
+    """
+    master, slave = os.openpty()
+    responder = RtuResponder({1: {}, 2: {9: 77, 10: 78}}, fd=master).start()
+    try:
+        yield responder, os.ttyname(slave)
+    finally:
+        responder.stop()
+        os.close(master)
+        os.close(slave)
+        transports.buses.clear()
+
+
+def _configs(device: str, frame_gap: float = 0.005):
+    line = {"transport": "rtu", "baudrate": 115200, "timeout": 0.5, "frame_gap": frame_gap}
+    return [
+        dict(line, host=device, port=0, unit=1, rw_registers=[1, 2, 3], input_indexes=[0, 1, 2], r_registers=[]),
+        dict(line, host=device, port=0, unit=2, rw_registers=[5], input_indexes=[3], r_registers=[10, 11]),
+    ]
+
+
+def test_frame_gap() -> None:
+    """
+    Test that the gap is 3.5 character times up to 19200 baud and 1.75 ms above.
+
+    """
+    assert transports.frame_gap(9600) == pytest.approx(3.5 * 10 / 9600)
+    assert transports.frame_gap(9600, parity="E") == pytest.approx(3.5 * 11 / 9600)
+    assert transports.frame_gap(115200) == 0.00175
+
+
+def test_coalesce() -> None:
+    """
+    Test that runs of consecutive registers become single blocks, in the order of the configuration.
+
+    """
+    assert transports.coalesce([1, 2, 3, 10, 11, 5]) == [(0, 0, 3), (9, 3, 2), (4, 5, 1)]
+    assert transports.coalesce([]) == []
+    assert len(transports.coalesce(list(range(1, 201)))) == 2
+
+
+def test_short_block_response_is_rejected() -> None:
+    """
+    Test that a block read answered with too few registers fails instead of shrinking the read buffer.
+
+    """
+    class ShortClient(FakeModbusClient):
+        def read_holding_registers(self, address, count=1, slave=0, **kwargs):
+            return FakeResponse([7] * (count - 1))
+
+    server = main.define_server({"host": "/dev/null", "port": 0, "transport": "rtu", "rw_registers": [],
+                                 "input_indexes": [], "r_registers": [1, 2, 3]})
+    server.client = ShortClient()
+
+    with pytest.raises(main.ModbusException):
+        server.read_registers()
+    assert len(server.read_buffer) == 3
+
+
+@requires_pty
+def test_rtu_devices_share_a_line(serial_line) -> None:
+    """
+    Test that two devices on a serial line share a client and exchange packed requests.
+
+    """
+    responder, device = serial_line
+    servers = main.define_servers(_configs(device))
+    for server in servers:
+        server.open_connection()
+
+    assert servers[0].client.bus is servers[1].client.bus
+    assert len(transports.buses) == 1
+
+    with patch.object(main, "SIM_SLEEP", 0), patch.object(main, "STEP_DEADLINE", None), \
+         patch.object(main, "journal", None), patch.object(main, "servers", servers):
+        TRNData = {MODEL: {"inputs": [1.0, 2.0, 3.0, 4.0], "outputs": [0.0, 0.0]}}
+        main.EndOfTimeStep(TRNData)
+
+    assert responder.units[1] == {0: 10, 1: 20, 2: 30}
+    assert responder.units[2][4] == 40
+    assert TRNData[MODEL]["outputs"] == [77, 78]
+    # One write to unit 1, one write and one read of two registers from unit 2.
+    assert [(unit, function) for _, unit, function in responder.frames] == [(1, 16), (2, 16), (2, 3)]
+
+    for server in servers:
+        server.close_connection()
+    assert not transports.buses
+
+
+@requires_pty
+def test_rtu_requests_are_serialized(serial_line) -> None:
+    """
+    Test that concurrent exchanges on one line are serialized and spaced by the inter-frame gap.
+
+    """
+    responder, device = serial_line
+    gap = 0.02
+    servers = main.define_servers(_configs(device, frame_gap=gap))
+    for server in servers:
+        server.open_connection()
+
+    with patch.object(main, "SIM_SLEEP", 0), patch.object(main, "STEP_DEADLINE", 5), \
+         patch.object(main, "journal", None), patch.object(main, "servers", servers):
+        TRNData = {MODEL: {"inputs": [1.0, 2.0, 3.0, 4.0], "outputs": [0.0, 0.0]}}
+        for _ in range(3):
+            main.EndOfTimeStep(TRNData)
+    main.executor.shutdown(wait=True)
+    main.executor = None
+
+    assert all(server.quality == main.QUALITY_GOOD for server in servers if server.r_registers)
+    assert len(responder.frames) == 9
+    for reply, (arrival, _, _) in zip(responder.replies, responder.frames[1:]):
+        assert arrival - reply >= gap * 0.8
+
+    for server in servers:
+        server.close_connection()
+
+
+def test_rtu_over_tcp() -> None:
+    """
+    Test that RTU frames are exchanged with a serial server over TCP.
+
+    """
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    port = listener.getsockname()[1]
+    served = {}
+
+    def accept():
+        connection, _ = listener.accept()
+        served["responder"] = RtuResponder({3: {0: 5}}, connection=connection).start()
+        served["connection"] = connection
+
+    acceptor = threading.Thread(target=accept, daemon=True)
+    acceptor.start()
+
+    server = main.define_server({"host": "127.0.0.1", "port": port, "transport": "rtu_over_tcp", "unit": 3, "timeout": 1,
+                                 "rw_registers": [2], "input_indexes": [0], "r_registers": [1]})
+    try:
+        server.open_connection()
+        server.exchange([1.5])
+        assert list(server.read_buffer) == [5]
+        acceptor.join(1)
+        assert served["responder"].units[3][1] == 15
+    finally:
+        server.close_connection()
+        if "responder" in served:
+            served["responder"].stop()
+            served["connection"].close()
+        listener.close()
+        transports.buses.clear()
+
+
+@requires_pty
+def test_reload_reopens_line(serial_line) -> None:
+    """
+    Test that a reload reopens a line whose serial settings changed, and rejects settings that differ within a line.
+
+    """
+    responder, device = serial_line
+    server_configs = _configs(device)
+    with patch.object(main, "servers", main.define_servers(server_configs)), \
+         patch.object(main, "server_configs", server_configs), patch.object(main, "scheduler", None), \
+         patch.object(main, "SIM_SLEEP", 0), patch.object(main, "STEP_DEADLINE", None), patch.object(main, "journal", None):
+        for server in main.servers:
+            server.open_connection()
+        old_bus = main.servers[0].client.bus
+
+        # Only one device at a new rate: the line cannot run at both, so nothing changes.
+        with pytest.raises(ValueError):
+            main.apply_server_configs([dict(server_configs[0], baudrate=19200), server_configs[1]])
+        assert main.server_configs is server_configs
+        assert transports.buses == {old_bus.key: old_bus}
+        assert old_bus.users == 2
+
+        main.apply_server_configs([dict(config, baudrate=19200) for config in server_configs])
+        bus = main.servers[0].client.bus
+        assert bus is not old_bus
+        assert main.servers[1].client.bus is bus
+        assert bus.client.comm_params.baudrate == 19200
+        assert transports.buses == {bus.key: bus}
+
+        TRNData = {MODEL: {"inputs": [1.0, 2.0, 3.0, 4.0], "outputs": [0.0, 0.0]}}
+        main.EndOfTimeStep(TRNData)
+        assert TRNData[MODEL]["outputs"] == [77, 78]
+
+        for server in main.servers:
+            server.close_connection()
+    assert not transports.buses